@@ -0,0 +1,325 @@
+'''
+Generates dungeons on all of the cpus and streams them to a JSON lines file as they are completed.
+Workers write the tile codes to shared memory, only the sizes of the dungeons are pickled.
+Every line has the generator, seed, constants and the tiles (one string per row, see Tiles.CHARACTERS)
+
+Usage:
+    python batch_generate.py experiment_two --count 1000
+    python batch_generate.py experiment_three --seeds A B C --param WIDTH=200 --param WIDTH=400 --output caves.jsonl
+
+With --cache DIR, dungeons are taken from the generation cache (see generation_cache.py) when they have been generated before.
+
+Every --param overrides a constant of the generator's module. Giving the same constant multiple times
+generates every seed with every value (and every combination of the other constants)
+'''
+
+# Default Modules
+import argparse
+import ast
+import importlib
+import itertools
+import json
+import os
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from multiprocessing import shared_memory
+from typing import Dict, List, Tuple
+
+# Licensed Modules
+import numpy as np
+
+# Custom Modules
+from dungeon_tiles import Tiles, tilesToCodes
+from generation_cache import DEFAULT_MAX_BYTES, GenerationCache, cacheKey
+from utilities import overrideConstants
+
+# Module -> generator class
+GENERATORS = {
+    "experiment_one": "Experiment1",
+    "experiment_two": "Experiment2",
+    "experiment_three": "Experiment3",
+}
+
+# Number of dungeons generated by a single task of a worker
+CHUNK_SIZE = 8
+# Max number of submitted tasks per worker. Keeps the workers busy without queueing the whole batch
+TASKS_PER_WORKER = 4
+# Seconds between the progress reports
+PROGRESS_INTERVAL = 1.0
+
+# Tile code -> character
+CHARACTER_TABLE = np.frombuffer(Tiles.CHARACTERS.encode("ascii"), dtype=np.uint8)
+
+# (seed, constants) of a dungeon
+Task = Tuple[str, Dict[str, object]]
+
+# Shared memory blocks the worker has attached to. Name -> block
+worker_slots : Dict[str, shared_memory.SharedMemory] = {}
+
+def initBatchWorker():
+    ''' Silences the prints of the generators so that they don't mix with the progress report '''
+
+    sys.stdout = open(os.devnull, "w")
+
+def generateDungeon(generator_name : str, seed : str, constants : Dict[str, object], cache : GenerationCache = None) -> Tuple[int, int, bytes]:
+    '''
+    Generates a single dungeon without a window. If a cache is given, the dungeon is taken from the cache
+    or added to it after generating
+
+    :param generator_name: module of the generator (see GENERATORS)
+    :type generator_name: str
+    :param seed: random generation seed
+    :type seed: str
+    :param constants: constants of the module to override
+    :type constants: Dict[str, object]
+    :param cache: cache of the generated dungeons, defaults to None
+    :type cache: GenerationCache, optional
+    :return: width, height and the tile codes of the dungeon
+    :rtype: Tuple[int, int, bytes]
+    '''
+
+    module = importlib.import_module(generator_name)
+
+    with overrideConstants(module, constants):
+        if cache != None:
+            key = cacheKey(generator_name, seed)
+            dungeon = cache.get(key)
+            if dungeon != None:
+                return dungeon.width, dungeon.height, dungeon.codes.tobytes()
+
+        generator = getattr(module, GENERATORS[generator_name])(seed=seed)
+        tiles = generator.generate()
+
+    if cache != None:
+        cache.put(key, generator, constants)
+
+    return generator.width, generator.height, tilesToCodes(tiles)
+
+def generateChunk(generator_name : str, tasks : List[Task], slot_name : str, cache : GenerationCache = None) -> List[Tuple[int, int, int]]:
+    '''
+    Generates the dungeons of the tasks in a worker and writes their tile codes one after another
+    into the shared memory slot, so only the sizes are sent back to the main process
+
+    :param generator_name: module of the generator (see GENERATORS)
+    :type generator_name: str
+    :param tasks: seed and constants of every dungeon
+    :type tasks: List[Task]
+    :param slot_name: name of the shared memory block to write to
+    :type slot_name: str
+    :param cache: cache of the generated dungeons, defaults to None
+    :type cache: GenerationCache, optional
+    :raises ValueError: if the dungeons don't fit to the slot
+    :return: width, height and the offset in the slot of every dungeon
+    :rtype: List[Tuple[int, int, int]]
+    '''
+
+    slot = worker_slots.get(slot_name)
+    if slot == None:
+        slot = worker_slots[slot_name] = shared_memory.SharedMemory(name=slot_name)
+
+    results = []
+    offset = 0
+
+    for seed, constants in tasks:
+        width, height, codes = generateDungeon(generator_name, seed, constants, cache)
+
+        if offset + len(codes) > slot.size:
+            raise ValueError(f"Dungeon {seed} doesn't fit to the shared memory slot")
+
+        slot.buf[offset:offset + len(codes)] = codes
+        results.append((width, height, offset))
+        offset += len(codes)
+
+    return results
+
+def maxDungeonSize(generator_name : str, tasks : List[Task]) -> int:
+    '''
+    :return: max number of tiles of the dungeons, based on the HEIGHT and WIDTH constants of the generator
+    :rtype: int
+    '''
+
+    module = importlib.import_module(generator_name)
+    size = 0
+
+    for _, constants in tasks:
+        with overrideConstants(module, constants):
+            size = max(size, module.HEIGHT * module.WIDTH)
+
+    return size
+
+def dungeonToJson(generator_name : str, task : Task, codes : np.ndarray) -> str:
+    '''
+    :param codes: 2D tile codes of the dungeon
+    :type codes: np.ndarray
+    :return: JSON line with the generator, seed, constants, size and the rows of the dungeon
+    :rtype: str
+    '''
+
+    seed, constants = task
+    characters = CHARACTER_TABLE[codes]
+
+    return json.dumps({
+        "generator": generator_name,
+        "seed": seed,
+        "constants": constants,
+        "width": codes.shape[1],
+        "height": codes.shape[0],
+        "tiles": [row.tobytes().decode("ascii") for row in characters],
+    })
+
+def parseConstants(params : List[str]) -> Dict[str, List[object]]:
+    '''
+    Parses the NAME=VALUE parameters. Values are read as python literals (e.g. 80, 0.5, (4, 15), "moore"),
+    anything else is used as a string
+
+    :param params: parameters from the command line
+    :type params: List[str]
+    :return: constant name -> values to generate with
+    :rtype: Dict[str, List[object]]
+    '''
+
+    constants : Dict[str, List[object]] = {}
+
+    for param in params:
+        name, separator, text = param.partition("=")
+        if separator == "":
+            raise ValueError(f"Parameter must be NAME=VALUE: {param}")
+
+        try:
+            value = ast.literal_eval(text)
+        except (ValueError, SyntaxError):
+            value = text
+
+        constants.setdefault(name.strip(), []).append(value)
+
+    return constants
+
+def createTasks(seeds : List[str], constants : Dict[str, List[object]]) -> List[Task]:
+    '''
+    :return: every seed with every combination of the constants
+    :rtype: List[Task]
+    '''
+
+    names = list(constants.keys())
+    combinations = [dict(zip(names, values)) for values in itertools.product(*constants.values())]
+
+    return [(seed, combination) for combination in combinations for seed in seeds]
+
+def reportProgress(done : int, total : int, start : float):
+    ''' Prints the number of generated dungeons, the throughput and the estimated remaining time '''
+
+    elapsed = time.perf_counter() - start
+    rate = done / elapsed if elapsed > 0 else 0
+    remaining = (total - done) / rate if rate > 0 else 0
+
+    print(f"\r{done}/{total} dungeons, {rate:.1f} dungeons/s, {elapsed:.0f}s elapsed, ~{remaining:.0f}s left", end="", file=sys.stderr, flush=True)
+
+def runBatch(generator_name : str, tasks : List[Task], output_path : str, workers : int = None, chunk_size : int = CHUNK_SIZE, cache : GenerationCache = None) -> int:
+    '''
+    Generates the dungeons on a process pool and appends them to the output as they are completed.
+    Tasks are submitted in chunks and only a few chunks per worker are queued at a time,
+    so the memory use doesn't grow with the size of the batch.
+
+    Every queued chunk gets a shared memory slot that the worker writes the tile codes to,
+    the main process reads them through numpy views of the slot instead of unpickling the tiles
+
+    :param generator_name: module of the generator (see GENERATORS)
+    :type generator_name: str
+    :param tasks: seed and constants of every dungeon
+    :type tasks: List[Task]
+    :param output_path: JSON lines file to write the dungeons to
+    :type output_path: str
+    :param workers: number of processes, defaults to the number of cpus
+    :type workers: int, optional
+    :param chunk_size: number of dungeons per task, defaults to CHUNK_SIZE
+    :type chunk_size: int, optional
+    :param cache: cache shared by the workers, defaults to None
+    :type cache: GenerationCache, optional
+    :return: number of generated dungeons
+    :rtype: int
+    '''
+
+    workers = workers or os.cpu_count()
+    chunks = iter([tasks[i:i + chunk_size] for i in range(0, len(tasks), chunk_size)])
+
+    slot_size = max(chunk_size * maxDungeonSize(generator_name, tasks), 1)
+    slots = [shared_memory.SharedMemory(create=True, size=slot_size) for _ in range(min(workers * TASKS_PER_WORKER, -(-len(tasks) // chunk_size)))]
+    free_slots = list(range(len(slots)))
+
+    done = 0
+    start = time.perf_counter()
+    last_report = start
+
+    try:
+        with open(output_path, "w") as output, ProcessPoolExecutor(workers, initializer=initBatchWorker) as executor:
+            # Future -> (chunk, slot)
+            pending = {}
+
+            while True:
+                # Top up the queue
+                while len(free_slots) > 0:
+                    chunk = next(chunks, None)
+                    if chunk == None:
+                        break
+
+                    slot = free_slots.pop()
+                    pending[executor.submit(generateChunk, generator_name, chunk, slots[slot].name, cache)] = (chunk, slot)
+
+                if len(pending) == 0:
+                    break
+
+                completed, _ = wait(pending.keys(), return_when=FIRST_COMPLETED)
+                for future in completed:
+                    chunk, slot = pending.pop(future)
+
+                    lines = []
+                    for task, (width, height, offset) in zip(chunk, future.result()):
+                        # View of the slot, no copy
+                        view = np.ndarray((height, width), dtype=np.uint8, buffer=slots[slot].buf, offset=offset)
+                        lines.append(dungeonToJson(generator_name, task, view))
+
+                    # Views have to be released before the slot can be closed
+                    view = None
+
+                    output.write("\n".join(lines) + "\n")
+                    done += len(lines)
+                    free_slots.append(slot)
+
+                if time.perf_counter() - last_report >= PROGRESS_INTERVAL:
+                    reportProgress(done, len(tasks), start)
+                    last_report = time.perf_counter()
+    finally:
+        for slot in slots:
+            slot.close()
+            slot.unlink()
+
+    reportProgress(done, len(tasks), start)
+    print(file=sys.stderr)
+
+    return done
+
+def main():
+    parser = argparse.ArgumentParser(description="Generates dungeons in batches on all of the cpus")
+    parser.add_argument("generator", choices=GENERATORS.keys(), help="generator module")
+    parser.add_argument("--seeds", nargs="+", default=[], help="seeds to generate")
+    parser.add_argument("--count", type=int, default=0, help="number of seeds to create in addition to --seeds")
+    parser.add_argument("--seed-prefix", default="BATCH", help="prefix of the created seeds")
+    parser.add_argument("--param", action="append", default=[], help="NAME=VALUE constant to override, can be repeated")
+    parser.add_argument("--output", default="dungeons.jsonl", help="JSON lines file to write to")
+    parser.add_argument("--workers", type=int, default=None, help="number of processes, defaults to the number of cpus")
+    parser.add_argument("--chunk-size", type=int, default=CHUNK_SIZE, help="dungeons per worker task")
+    parser.add_argument("--cache", default=None, help="directory of the generation cache, disabled by default")
+    parser.add_argument("--cache-size", type=int, default=DEFAULT_MAX_BYTES // 2**20, help="max size of the cache in MB")
+    args = parser.parse_args()
+
+    seeds = args.seeds + [f"{args.seed_prefix}{i}" for i in range(args.count)]
+    if len(seeds) == 0:
+        parser.error("no seeds given, use --seeds or --count")
+
+    tasks = createTasks(seeds, parseConstants(args.param))
+    cache = GenerationCache(args.cache, args.cache_size * 2**20) if args.cache != None else None
+    runBatch(args.generator, tasks, args.output, args.workers, args.chunk_size, cache)
+
+if __name__ == "__main__":
+    main()
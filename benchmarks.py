@@ -0,0 +1,287 @@
+'''
+Benchmarks for the performance critical parts of the generation.
+
+Usage:
+    python benchmarks.py            -> runs all of the benchmarks
+    python benchmarks.py <name> ... -> runs the given benchmarks
+'''
+
+# Default Modules
+import statistics
+import subprocess
+import sys
+import time
+from typing import Callable, Dict, List
+
+# Modules that should be importable without pygame and without printing anything
+HEADLESS_MODULES = [
+    "utilities",
+    "path_finding",
+    "triangulation",
+    "dungeon_parts",
+    "dungeon_defaults",
+    "experiment_one",
+    "experiment_two",
+    "experiment_three",
+    "batch_generate",
+    "dungeon_file",
+    "generation_cache",
+    "pipeline",
+    "chunk_world",
+    "sparse_tiles",
+    "budget",
+]
+
+# Number of fresh interpreters to start per module
+IMPORT_REPEATS = 5
+
+# Runs in a fresh interpreter, last line of the output is the measurement
+IMPORT_SCRIPT = '''\
+import sys, time
+start = time.perf_counter()
+import {module}
+print(time.perf_counter() - start, "pygame" in sys.modules)
+'''
+
+def benchmarkImportTime() -> bool:
+    '''
+    Measures the import time of the headless modules in fresh interpreters.
+    Fails if one of them imports pygame or prints anything while being imported
+
+    :return: True if all of the modules are side-effect free
+    :rtype: bool
+    '''
+
+    success = True
+
+    print(f"{'module':<20}{'median ms':>12}{'pygame':>10}{'output':>10}")
+
+    for module in HEADLESS_MODULES:
+        timings : List[float] = []
+        loads_pygame = False
+        has_output = False
+
+        for _ in range(IMPORT_REPEATS):
+            result = subprocess.run([sys.executable, "-c", IMPORT_SCRIPT.format(module=module)], capture_output=True, text=True, check=True)
+            lines = result.stdout.splitlines()
+
+            # Everything before the measurement has been printed by the import
+            has_output = has_output or len(lines) > 1
+            duration, pygame_loaded = lines[-1].split()
+            loads_pygame = loads_pygame or pygame_loaded == "True"
+            timings.append(float(duration) * 1000)
+
+        print(f"{module:<20}{statistics.median(timings):>12.2f}{str(loads_pygame):>10}{str(has_output):>10}")
+
+        if loads_pygame or has_output:
+            success = False
+
+    return success
+
+# Size of the cave maps used by the automata benchmarks
+AUTOMATA_SIZES = [1000, 4000, 10000]
+AUTOMATA_STEPS = 10
+
+def benchmarkAutomata() -> bool:
+    '''
+    Measures the time per step of the vectorized, bit-packed and process-parallel cellular automata
+
+    :return: False if the backends don't produce the same caves
+    :rtype: bool
+    '''
+
+    # Licensed Modules
+    import numpy as np
+
+    # Custom Modules
+    from cellular_automata import AutomataRule, randomPackedCells, runPackedCellularAutomata, runParallelCellularAutomata, unpackCells
+
+    rule = AutomataRule.fromLimits(2, 5)
+
+    print(f"{'size':<10}{'backend':<12}{'ms/step':>10}{'MB':>10}")
+
+    for size in AUTOMATA_SIZES:
+        packed = randomPackedCells(size, size, 0.45, 0)
+
+        start = time.perf_counter()
+        result = runPackedCellularAutomata(packed, size, AUTOMATA_STEPS, rule)
+        duration = (time.perf_counter() - start) / AUTOMATA_STEPS
+        print(f"{size:<10}{'packed':<12}{duration * 1000:>10.2f}{result.nbytes / 2**20:>10.1f}")
+
+        # Byte per cell grid gets too big for the largest maps
+        if size > 4000:
+            continue
+
+        cells = unpackCells(packed, size)
+
+        start = time.perf_counter()
+        parallel = runParallelCellularAutomata(cells, AUTOMATA_STEPS, rule)
+        duration = (time.perf_counter() - start) / AUTOMATA_STEPS
+        print(f"{size:<10}{'parallel':<12}{duration * 1000:>10.2f}{cells.nbytes * 2 / 2**20:>10.1f}")
+
+        start = time.perf_counter()
+        for _ in range(AUTOMATA_STEPS):
+            cells = rule.step(cells)
+        duration = (time.perf_counter() - start) / AUTOMATA_STEPS
+        print(f"{size:<10}{'vectorized':<12}{duration * 1000:>10.2f}{cells.nbytes / 2**20:>10.1f}")
+
+        if not np.array_equal(cells, unpackCells(result, size)) or not np.array_equal(cells, parallel):
+            print("ERROR: Backends don't match")
+            return False
+
+    return True
+
+# Rules, neighbourhoods and boundaries to measure
+AUTOMATA_RULES = [
+    ("B5678/S345678", "moore", "dead"),
+    ("B5678/S345678", "moore", "wrap"),
+    ("B34/S234", "von_neumann", "alive"),
+    ("B13,14,15,16,17,18,19,20,21,22,23,24/S12,13,14,15,16,17,18,19,20,21,22,23,24", "moore_radius_2", "dead"),
+]
+
+def benchmarkAutomataRules() -> bool:
+    '''
+    Measures the time per step of the compiled rules on a 1000x1000 grid
+
+    :return: always True
+    :rtype: bool
+    '''
+
+    # Licensed Modules
+    import numpy as np
+
+    # Custom Modules
+    from cellular_automata import AutomataRule
+
+    cells = np.random.default_rng(0).random((1000, 1000)) < 0.45
+
+    print(f"{'rule':<20}{'neighbourhood':<16}{'boundary':<10}{'ms/step':>10}")
+
+    for rule_string, neighbourhood, boundary in AUTOMATA_RULES:
+        rule = AutomataRule(rule_string, neighbourhood, boundary)
+
+        start = time.perf_counter()
+        result = cells
+        for _ in range(AUTOMATA_STEPS):
+            result = rule.step(result)
+        duration = (time.perf_counter() - start) / AUTOMATA_STEPS
+
+        print(f"{str(rule)[:19]:<20}{neighbourhood:<16}{boundary:<10}{duration * 1000:>10.2f}")
+
+    return True
+
+# Size of the cave map and the settings used by the multi-resolution benchmark
+MULTI_RESOLUTION_SIZE = 4000
+MULTI_RESOLUTION_SETTINGS = [(2, 8, 3, 0.5), (4, 8, 3, 0.5)]
+
+def benchmarkMultiResolution() -> bool:
+    '''
+    Compares the cell updates, time and cave statistics of the full resolution automata
+    with the coarse then upsample and refine runs
+
+    :return: always True
+    :rtype: bool
+    '''
+
+    # Licensed Modules
+    import numpy as np
+
+    # Custom Modules
+    from cellular_automata import AutomataRule, upsampleCells
+    from regions import RegionIndex
+
+    rule = AutomataRule.fromLimits(2, 5)
+    size = MULTI_RESOLUTION_SIZE
+    rng = np.random.default_rng(0)
+
+    print(f"{'mode':<16}{'updates':>10}{'ms':>10}{'floor':>8}{'regions':>10}{'largest':>10}")
+
+    def report(name : str, cells, updates : int, duration : float):
+        index = RegionIndex.fromCells(cells)
+        print(f"{name:<16}{updates / size**2:>9.2f}N{duration * 1000:>10.0f}{cells.mean():>8.3f}{index.num_regions:>10}{int(index.regionSizes().max()):>10}")
+
+    cells = rng.random((size, size)) < 0.45
+    start = time.perf_counter()
+    for _ in range(AUTOMATA_STEPS):
+        cells = rule.step(cells)
+    report("full", cells, AUTOMATA_STEPS * size**2, time.perf_counter() - start)
+
+    for factor, coarse_steps, refine_steps, noise in MULTI_RESOLUTION_SETTINGS:
+        coarse_size = -(-size // factor)
+        cells = rng.random((coarse_size, coarse_size)) < 0.45
+
+        start = time.perf_counter()
+        for _ in range(coarse_steps):
+            cells = rule.step(cells)
+        cells = upsampleCells(cells, factor, size, size, noise, rng)
+        for _ in range(refine_steps):
+            cells = rule.step(cells)
+        duration = time.perf_counter() - start
+
+        report(f"x{factor} {coarse_steps}+{refine_steps}", cells, coarse_steps * coarse_size**2 + refine_steps * size**2, duration)
+
+    return True
+
+# Size of the cave maps used by the region labeling benchmark
+REGION_SIZES = [1000, 2000, 4000]
+
+def benchmarkRegions() -> bool:
+    '''
+    Measures the time to label the connected regions of smoothed caves and to find the tunnels that connect them
+
+    :return: always True
+    :rtype: bool
+    '''
+
+    # Licensed Modules
+    import numpy as np
+
+    # Custom Modules
+    from cellular_automata import AutomataRule
+    from regions import RegionIndex, findRegionConnections, labelRegions
+
+    rule = AutomataRule.fromLimits(2, 5)
+
+    print(f"{'size':<10}{'regions':>10}{'label ms':>12}{'connect ms':>12}")
+
+    for size in REGION_SIZES:
+        cells = np.random.default_rng(0).random((size, size)) < 0.45
+        for _ in range(AUTOMATA_STEPS):
+            cells = rule.step(cells)
+
+        start = time.perf_counter()
+        index = RegionIndex(*labelRegions(cells))
+        label_duration = time.perf_counter() - start
+
+        start = time.perf_counter()
+        findRegionConnections(index)
+        connect_duration = time.perf_counter() - start
+
+        print(f"{size:<10}{index.num_regions:>10}{label_duration * 1000:>12.2f}{connect_duration * 1000:>12.2f}")
+
+    return True
+
+# Name -> benchmark. Each benchmark returns False if it has failed
+BENCHMARKS : Dict[str, Callable[[], bool]] = {
+    "import_time": benchmarkImportTime,
+    "automata": benchmarkAutomata,
+    "automata_rules": benchmarkAutomataRules,
+    "multi_resolution": benchmarkMultiResolution,
+    "regions": benchmarkRegions,
+}
+
+def main():
+    names = sys.argv[1:] if len(sys.argv) > 1 else list(BENCHMARKS.keys())
+
+    failed = []
+    for name in names:
+        print(f"== {name}")
+        if BENCHMARKS[name]() == False:
+            failed.append(name)
+
+    if len(failed) > 0:
+        print("FAILED:", ", ".join(failed))
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
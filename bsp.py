@@ -0,0 +1,154 @@
+# Default Modules
+import random
+from array import array
+from typing import Iterator, List
+
+# Custom Modules
+from utilities import Coordinate, SquareArea, percentageDifference, splitOffset
+
+# Node doesn't have any children
+NO_CHILD = -1
+# Areas that are this much (%) longer on one side are always split on that side
+LONG_AREA_PERCENTAGE = 25
+
+
+class BSPTree():
+    '''
+    Binary space partitioning tree stored in flat arrays instead of a node object per area.
+    Node i covers the area (x[i], y[i], width[i], height[i]), node 0 is the root.
+    Leaves have NO_CHILD as their children
+    '''
+
+    def __init__(self):
+        self.x = array("i")
+        self.y = array("i")
+        self.width = array("i")
+        self.height = array("i")
+        self.parent = array("i")
+        self.child1 = array("i")
+        self.child2 = array("i")
+
+        # Indices of the leaf nodes in the order they were created
+        self.leaves = array("i")
+
+    def __len__(self) -> int:
+        return len(self.x)
+
+    def addNode(self, x : int, y : int, width : int, height : int, parent : int) -> int:
+        '''
+        Adds a leaf node to the tree
+
+        :return: index of the node
+        :rtype: int
+        '''
+
+        self.x.append(x)
+        self.y.append(y)
+        self.width.append(width)
+        self.height.append(height)
+        self.parent.append(parent)
+        self.child1.append(NO_CHILD)
+        self.child2.append(NO_CHILD)
+
+        return len(self.x) - 1
+
+    def area(self, node : int) -> SquareArea:
+        '''
+        :return: area of the node
+        :rtype: SquareArea
+        '''
+
+        return SquareArea(Coordinate(self.x[node], self.y[node]), self.width[node], self.height[node])
+
+    def leafAreas(self) -> List[SquareArea]:
+        '''
+        :return: areas of the leaves
+        :rtype: List[SquareArea]
+        '''
+
+        return [self.area(leaf) for leaf in self.leaves]
+
+    def preorder(self) -> Iterator[int]:
+        '''
+        Visits the nodes in the order they were split (parent first, then the first child's subtree)
+
+        :return: indices of the nodes
+        :rtype: Iterator[int]
+        '''
+
+        stack = [0] if len(self) > 0 else []
+
+        while len(stack) > 0:
+            node = stack.pop()
+            yield node
+
+            if self.child1[node] != NO_CHILD:
+                stack.append(self.child2[node])
+                stack.append(self.child1[node])
+
+    @staticmethod
+    def build(width : int, height : int, max_leaf_width : float, max_leaf_height : float, shift_percentage : int = 25, rng : random.Random = None) -> 'BSPTree':
+        '''
+        Partitions the area into two until the parts are small enough to be leaves.
+        Long areas are split on their long side, the others on a random side.
+        Uses an explicit stack and visits the nodes in the same order (and draws the same random numbers)
+        as splitting them recursively would
+
+        :param width: width of the area to partition
+        :type width: int
+        :param height: height of the area to partition
+        :type height: int
+        :param max_leaf_width: areas within this width and @max_leaf_height are not split anymore
+        :type max_leaf_width: float
+        :param max_leaf_height: areas within this height and @max_leaf_width are not split anymore
+        :type max_leaf_height: float
+        :param shift_percentage: max amount that the split line can move away from the middle, defaults to 25
+        :type shift_percentage: int, optional
+        :param rng: random generator to draw from, defaults to the global random module
+        :type rng: random.Random, optional
+        :return: partitioned tree
+        :rtype: BSPTree
+        '''
+
+        if rng == None:
+            rng = random
+
+        tree = BSPTree()
+        stack = [tree.addNode(0, 0, width, height, NO_CHILD)]
+
+        while len(stack) > 0:
+            node = stack.pop()
+            x, y = tree.x[node], tree.y[node]
+            node_width, node_height = tree.width[node], tree.height[node]
+
+            # Check if the area fits to be a room
+            if node_height <= max_leaf_height and node_width <= max_leaf_width:
+                tree.leaves.append(node)
+                continue
+
+            # 0 = Split the height, 1 = Split the width
+            split_decision = rng.randint(0,1)
+
+            # If partitians are too wide or long
+            if percentageDifference(node_height, node_width) >= LONG_AREA_PERCENTAGE:
+                split_decision = 1
+            elif percentageDifference(node_width, node_height) >= LONG_AREA_PERCENTAGE:
+                split_decision = 0
+
+            if split_decision == 1:
+                split = splitOffset(node_width, shift_percentage, rng)
+                child1 = tree.addNode(x, y, split, node_height, node)
+                child2 = tree.addNode(x + split, y, node_width - split, node_height, node)
+            else:
+                split = splitOffset(node_height, shift_percentage, rng)
+                child1 = tree.addNode(x, y, node_width, split, node)
+                child2 = tree.addNode(x, y + split, node_width, node_height - split, node)
+
+            tree.child1[node] = child1
+            tree.child2[node] = child2
+
+            # Second child is pushed first so that the first child is split first
+            stack.append(child2)
+            stack.append(child1)
+
+        return tree
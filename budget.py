@@ -0,0 +1,60 @@
+'''
+Time limit of a generation.
+
+The stages check the budget and take cheaper shortcuts when the time is running out (e.g. fewer rooms, no loops,
+straight corridors instead of A*). Every shortcut that is taken is recorded in GenerationBudget.degradations
+'''
+
+# Default Modules
+import time
+from typing import List
+
+
+class GenerationBudget():
+    ''' Time limit of a generator. The clock starts when the budget is created '''
+
+    def __init__(self, time_limit : float = None):
+        '''
+        :param time_limit: seconds the generation can take. If None, there is no limit, defaults to None
+        :type time_limit: float, optional
+        '''
+
+        self.time_limit = time_limit
+        self.start_time = time.perf_counter()
+
+        # Names of the shortcuts taken to stay within the limit, in the order they were taken
+        self.degradations : List[str] = []
+
+    def elapsed(self) -> float:
+        ''' Seconds since the budget was created '''
+
+        return time.perf_counter() - self.start_time
+
+    def remaining(self) -> float:
+        ''' Seconds left, infinite if there is no limit '''
+
+        if self.time_limit == None:
+            return float("inf")
+
+        return self.time_limit - self.elapsed()
+
+    def isOver(self, share : float = 1.0) -> bool:
+        '''
+        :param share: share of the time limit to check, defaults to 1.0 (the whole limit)
+        :type share: float, optional
+        :return: True if more than the share of the time limit has passed. Always False if there is no limit
+        :rtype: bool
+        '''
+
+        return self.time_limit != None and self.elapsed() >= self.time_limit * share
+
+    def degrade(self, name : str):
+        '''
+        Records a shortcut. Shortcuts that are taken multiple times are recorded once
+
+        :param name: name of the shortcut, e.g. "fewer_rooms"
+        :type name: str
+        '''
+
+        if name not in self.degradations:
+            self.degradations.append(name)
@@ -0,0 +1,149 @@
+# Default Modules
+import math
+from typing import Tuple
+
+
+class Camera():
+    '''
+    Keeps track of the visible part of the map.
+    Location is the top left corner of the view in tiles, zoom is the size of a tile in pixels
+    '''
+
+    # Amount of the view that will be moved with a single key press (0-1)
+    PAN_RATIO = 0.1
+    # Zoom multiplier applied on every mouse wheel step
+    ZOOM_STEP = 1.25
+
+    def __init__(self, view_width : int, view_height : int, tile_size : float, min_tile_size : float = 0.05, max_tile_size : float = 64):
+        '''
+        :param view_width: width of the view in pixels
+        :type view_width: int
+        :param view_height: height of the view in pixels
+        :type view_height: int
+        :param tile_size: initial size of a tile in pixels
+        :type tile_size: float
+        :param min_tile_size: max zoom out, defaults to 0.05
+        :type min_tile_size: float, optional
+        :param max_tile_size: max zoom in, defaults to 64
+        :type max_tile_size: float, optional
+        '''
+
+        self.view_width = view_width
+        self.view_height = view_height
+
+        self.min_tile_size = min_tile_size
+        self.max_tile_size = max_tile_size
+        self.tile_size = max(min(tile_size, max_tile_size), min_tile_size)
+
+        # Top left corner of the view in tiles
+        self.X = 0.0
+        self.Y = 0.0
+
+        # Is the view being dragged with the mouse
+        self.dragging = False
+
+    def pan(self, dx : float, dy : float):
+        '''
+        Moves the camera by the given amount of pixels
+
+        :param dx: pixels to move on the X axis
+        :type dx: float
+        :param dy: pixels to move on the Y axis
+        :type dy: float
+        '''
+
+        self.X += dx / self.tile_size
+        self.Y += dy / self.tile_size
+
+    def zoom(self, factor : float, pivot : Tuple[int, int] = None):
+        '''
+        Zooms the camera while keeping the tile under the @pivot at the same place on the screen
+
+        :param factor: multiplier of the tile size
+        :type factor: float
+        :param pivot: screen location in pixels to zoom at, defaults to the center of the view
+        :type pivot: Tuple[int, int], optional
+        '''
+
+        if pivot == None:
+            pivot = (self.view_width / 2, self.view_height / 2)
+
+        # Tile under the pivot before zooming
+        pivot_x = self.X + pivot[0] / self.tile_size
+        pivot_y = self.Y + pivot[1] / self.tile_size
+
+        self.tile_size = max(min(self.tile_size * factor, self.max_tile_size), self.min_tile_size)
+
+        self.X = pivot_x - pivot[0] / self.tile_size
+        self.Y = pivot_y - pivot[1] / self.tile_size
+
+    def visibleTiles(self, map_width : int, map_height : int, tile_size : float = None) -> Tuple[int, int, int, int]:
+        '''
+        Returns the range of the tiles that are within the view
+
+        :param map_width: number of tiles on the X axis
+        :type map_width: int
+        :param map_height: number of tiles on the Y axis
+        :type map_height: int
+        :param tile_size: size of a tile the view is drawn with, defaults to @self.tile_size
+        :type tile_size: float, optional
+        :return: x0, y0, x1, y1 where x1 and y1 are exclusive
+        :rtype: Tuple[int, int, int, int]
+        '''
+
+        if tile_size == None:
+            tile_size = self.tile_size
+
+        x0 = max(0, math.floor(self.X))
+        y0 = max(0, math.floor(self.Y))
+        x1 = min(map_width, math.ceil(self.X + self.view_width / tile_size))
+        y1 = min(map_height, math.ceil(self.Y + self.view_height / tile_size))
+
+        return (x0, y0, max(x0, x1), max(y0, y1))
+
+    def handleEvent(self, event) -> bool:
+        '''
+        Pans with the arrow keys or by dragging with the mouse and zooms with the mouse wheel
+
+        :param event: pygame event
+        :type event: pygame.event.Event
+        :return: True if the camera has moved
+        :rtype: bool
+        '''
+
+        # Licensed Modules
+        import pygame
+
+        if event.type == pygame.KEYDOWN:
+            step_x = self.view_width * self.PAN_RATIO
+            step_y = self.view_height * self.PAN_RATIO
+
+            if event.key in (pygame.K_LEFT, pygame.K_a):
+                self.pan(-step_x, 0)
+            elif event.key in (pygame.K_RIGHT, pygame.K_d):
+                self.pan(step_x, 0)
+            elif event.key in (pygame.K_UP, pygame.K_w):
+                self.pan(0, -step_y)
+            elif event.key in (pygame.K_DOWN, pygame.K_s):
+                self.pan(0, step_y)
+            elif event.key in (pygame.K_PLUS, pygame.K_EQUALS, pygame.K_KP_PLUS):
+                self.zoom(self.ZOOM_STEP)
+            elif event.key in (pygame.K_MINUS, pygame.K_KP_MINUS):
+                self.zoom(1 / self.ZOOM_STEP)
+            else:
+                return False
+            return True
+
+        if event.type == pygame.MOUSEWHEEL:
+            self.zoom(self.ZOOM_STEP ** event.y, pygame.mouse.get_pos())
+            return True
+
+        if event.type == pygame.MOUSEBUTTONDOWN and event.button == 1:
+            self.dragging = True
+        elif event.type == pygame.MOUSEBUTTONUP and event.button == 1:
+            self.dragging = False
+        elif event.type == pygame.MOUSEMOTION and self.dragging:
+            self.pan(-event.rel[0], -event.rel[1])
+            return True
+
+        return False
@@ -0,0 +1,597 @@
+# Default Modules
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory, util
+from typing import List, Tuple
+
+# Licensed Modules
+import numpy as np
+
+# Custom Modules
+from dungeon_tiles import Tile, Tiles
+
+
+# Neighbour offsets (y, x) of the supported neighbourhoods
+NEIGHBOURHOODS = {
+    "moore": [(y, x) for y in range(-1, 2) for x in range(-1, 2) if (y, x) != (0, 0)],
+    "von_neumann": [(-1, 0), (0, -1), (0, 1), (1, 0)],
+    "moore_radius_2": [(y, x) for y in range(-2, 3) for x in range(-2, 3) if (y, x) != (0, 0)],
+}
+
+# What the cells outside of the grid count as
+BOUNDARIES = ["dead", "alive", "wrap"]
+
+def parseRuleString(rule_string : str, max_count : int) -> Tuple[List[int], List[int]]:
+    '''
+    Parses a life-like rule in B/S notation. e.g. "B3/S23" or "B5678/S345678".
+    Counts bigger than 9 can be written with commas. e.g. "B10,11,12/S9,10"
+
+    :param rule_string: rule to parse
+    :type rule_string: str
+    :param max_count: max number of neighbours a cell can have
+    :type max_count: int
+    :raises ValueError: if the rule is not in B/S notation or the counts are out of range
+    :return: birth counts and survive counts
+    :rtype: Tuple[List[int], List[int]]
+    '''
+
+    counts = {"B": [], "S": []}
+
+    for part in rule_string.upper().replace(" ", "").split("/"):
+        if len(part) == 0 or part[0] not in counts:
+            raise ValueError(f"Invalid rule: {rule_string}, expected B/S notation such as B3/S23")
+
+        body = part[1:]
+        numbers = body.split(",") if "," in body else list(body)
+
+        for number in numbers:
+            if not number.isdigit() or int(number) > max_count:
+                raise ValueError(f"Invalid neighbour count in rule {rule_string}: {number}")
+            counts[part[0]].append(int(number))
+
+    return sorted(set(counts["B"])), sorted(set(counts["S"]))
+
+class AutomataRule():
+    '''
+    Life-like cellular automata rule compiled into a lookup table of [is alive][number of alive neighbours] -> next state.
+    Neighbours are counted for the whole grid at once, so a step is a few array operations regardless of the rule
+    '''
+
+    def __init__(self, rule_string : str = "B5678/S345678", neighbourhood : str = "moore", boundary : str = "dead"):
+        '''
+        :param rule_string: rule in B/S notation, defaults to "B5678/S345678"
+        :type rule_string: str, optional
+        :param neighbourhood: one of the NEIGHBOURHOODS, defaults to "moore"
+        :type neighbourhood: str, optional
+        :param boundary: one of the BOUNDARIES, defaults to "dead"
+        :type boundary: str, optional
+        :raises ValueError: if the rule, neighbourhood or boundary is not valid
+        '''
+
+        if neighbourhood not in NEIGHBOURHOODS:
+            raise ValueError(f"Unknown neighbourhood: {neighbourhood}, expected one of {list(NEIGHBOURHOODS.keys())}")
+        if boundary not in BOUNDARIES:
+            raise ValueError(f"Unknown boundary: {boundary}, expected one of {BOUNDARIES}")
+
+        self.neighbourhood = neighbourhood
+        self.boundary = boundary
+        self.offsets = NEIGHBOURHOODS[neighbourhood]
+        self.radius = max(max(abs(y), abs(x)) for y, x in self.offsets)
+
+        max_count = len(self.offsets)
+        self.birth, self.survive = parseRuleString(rule_string, max_count)
+
+        # Lookup table. [0] = dead cell, [1] = alive cell
+        self.table = np.zeros((2, max_count + 1), dtype=bool)
+        self.table[0, self.birth] = True
+        self.table[1, self.survive] = True
+
+    @staticmethod
+    def fromLimits(starve_limit : int, birth_limit : int, neighbourhood : str = "moore", boundary : str = "dead"):
+        '''
+        Creates the rule from the limits used by Experiment3
+
+        :param starve_limit: alive cells with this many or less alive neighbours die
+        :type starve_limit: int
+        :param birth_limit: dead cells with this many or more alive neighbours become alive
+        :type birth_limit: int
+        :return: equivalent rule
+        :rtype: AutomataRule
+        '''
+
+        max_count = len(NEIGHBOURHOODS.get(neighbourhood, []))
+        birth = range(max(birth_limit, 0), max_count + 1)
+        survive = range(max(starve_limit + 1, 0), max_count + 1)
+
+        return AutomataRule(f"B{formatCounts(birth)}/S{formatCounts(survive)}", neighbourhood, boundary)
+
+    def __str__(self) -> str:
+        return f"B{formatCounts(self.birth)}/S{formatCounts(self.survive)}"
+
+    def pad(self, cells : np.ndarray) -> np.ndarray:
+        '''
+        Surrounds the grid with @self.radius cells based on the boundary
+
+        :param cells: 2D boolean grid where True means alive
+        :type cells: np.ndarray
+        :return: padded grid
+        :rtype: np.ndarray
+        '''
+
+        if self.boundary == "wrap":
+            return np.pad(cells, self.radius, mode="wrap")
+
+        return np.pad(cells, self.radius, constant_values=self.boundary == "alive")
+
+    def window(self, cells : np.ndarray, top : int, bottom : int, left : int, right : int) -> np.ndarray:
+        '''
+        Returns a part of the grid together with the neighbours needed to step it. 
+        Same as self.pad(cells)[top:bottom + 2r, left:right + 2r] without padding the whole grid
+
+        :param cells: 2D boolean grid where True means alive
+        :type cells: np.ndarray
+        :param top: first row of the part
+        :type top: int
+        :param bottom: row after the last row of the part
+        :type bottom: int
+        :param left: first column of the part
+        :type left: int
+        :param right: column after the last column of the part
+        :type right: int
+        :return: part of the grid with a halo of @self.radius cells
+        :rtype: np.ndarray
+        '''
+
+        height, width = cells.shape
+        r = self.radius
+
+        if self.boundary == "wrap":
+            rows = np.arange(top - r, bottom + r) % height
+            columns = np.arange(left - r, right + r) % width
+            return cells[np.ix_(rows, columns)]
+
+        # Cut at the borders of the grid and pad the missing part
+        halo_top, halo_bottom = max(0, top - r), min(height, bottom + r)
+        halo_left, halo_right = max(0, left - r), min(width, right + r)
+
+        padding = (
+            (halo_top - (top - r), (bottom + r) - halo_bottom), 
+            (halo_left - (left - r), (right + r) - halo_right)
+        )
+        return np.pad(cells[halo_top:halo_bottom, halo_left:halo_right], padding, constant_values=self.boundary == "alive")
+
+    def stepWindow(self, window : np.ndarray) -> np.ndarray:
+        '''
+        Applies the rule to the inner part of a padded grid
+
+        :param window: grid with a halo of @self.radius cells
+        :type window: np.ndarray
+        :return: next state of the inner part
+        :rtype: np.ndarray
+        '''
+
+        r = self.radius
+        height = window.shape[0] - 2 * r
+        width = window.shape[1] - 2 * r
+
+        window = window.astype(np.uint8)
+        counts = np.zeros((height, width), dtype=np.uint8)
+
+        for y, x in self.offsets:
+            counts += window[r + y:r + y + height, r + x:r + x + width]
+
+        return self.table[window[r:r + height, r:r + width], counts]
+
+    def step(self, cells : np.ndarray) -> np.ndarray:
+        '''
+        Applies one step of the rule to the whole grid
+
+        :param cells: 2D boolean grid where True means alive
+        :type cells: np.ndarray
+        :return: new grid
+        :rtype: np.ndarray
+        '''
+
+        return self.stepWindow(self.pad(cells))
+
+def formatCounts(counts) -> str:
+    ''' Writes the neighbour counts of a rule. Uses commas if any of them has more than one digit '''
+
+    counts = list(counts)
+    separator = "," if any(count > 9 for count in counts) else ""
+    return separator.join(str(count) for count in counts)
+
+def cellsToTiles(cells : np.ndarray, alive_tile : Tile = Tiles.PATH, dead_tile : Tile = Tiles.WALL) -> List[List[Tile]]:
+    '''
+    Converts the boolean grid into tiles
+
+    :param cells: 2D boolean grid where True means alive
+    :type cells: np.ndarray
+    :param alive_tile: tile to use for the alive cells, defaults to Tiles.PATH
+    :type alive_tile: Tile, optional
+    :param dead_tile: tile to use for the dead cells, defaults to Tiles.WALL
+    :type dead_tile: Tile, optional
+    :return: 2D matrix of tiles
+    :rtype: List[List[Tile]]
+    '''
+
+    # Row by row so that the whole grid is never held as a list of Python bools next to the tiles
+    lookup = np.array([dead_tile, alive_tile], dtype=object)
+    return [lookup[row].tolist() for row in cells.view(np.uint8)]
+
+def upsampleCells(cells : np.ndarray, factor : int, height : int, width : int, noise : float = 0, rng : np.random.Generator = None, life_chance : float = 0.45) -> np.ndarray:
+    '''
+    Scales the grid up by repeating every cell as a @factor x @factor block.
+    Blocks would keep their square edges through the refinement steps, so a ratio of the cells
+    can be re-rolled to bring back the small scale detail of the caves
+
+    :param cells: coarse 2D boolean grid
+    :type cells: np.ndarray
+    :param factor: scale of the upsampling
+    :type factor: int
+    :param height: height of the result, extra rows of the last blocks are cropped
+    :type height: int
+    :param width: width of the result, extra columns of the last blocks are cropped
+    :type width: int
+    :param noise: ratio of the cells to re-roll (0-1), defaults to 0
+    :type noise: float, optional
+    :param rng: random generator of the noise, required if @noise > 0
+    :type rng: np.random.Generator, optional
+    :param life_chance: chance of a re-rolled cell to be alive, defaults to 0.45
+    :type life_chance: float, optional
+    :return: 2D boolean grid of the given size
+    :rtype: np.ndarray
+    '''
+
+    upsampled = np.repeat(np.repeat(cells, factor, axis=0), factor, axis=1)[:height, :width]
+
+    if noise > 0:
+        reroll = rng.random((height, width)) < noise
+        upsampled = np.where(reroll, rng.random((height, width)) < life_chance, upsampled)
+
+    return upsampled
+
+# Number of cells stored in each word of the packed grid
+WORD_BITS = 64
+
+def packCells(cells : np.ndarray) -> np.ndarray:
+    '''
+    Packs the boolean grid into bits. Each row is stored as 64 bit words where 
+    the cell x is the bit (x % 64) of the word (x // 64)
+
+    :param cells: 2D boolean grid where True means alive
+    :type cells: np.ndarray
+    :return: packed grid with the shape of (height, words per row)
+    :rtype: np.ndarray
+    '''
+
+    height, width = cells.shape
+    words = (width + WORD_BITS - 1) // WORD_BITS
+
+    padded = np.zeros((height, words * WORD_BITS), dtype=bool)
+    padded[:, :width] = cells
+
+    return np.packbits(padded, axis=1, bitorder="little").view("<u8")
+
+def unpackCells(packed : np.ndarray, width : int) -> np.ndarray:
+    '''
+    Unpacks the bits back to a boolean grid
+
+    :param packed: packed grid
+    :type packed: np.ndarray
+    :param width: number of cells on each row
+    :type width: int
+    :return: 2D boolean grid where True means alive
+    :rtype: np.ndarray
+    '''
+
+    return np.unpackbits(packed.view(np.uint8), axis=1, count=width, bitorder="little").astype(bool)
+
+def randomCells(height : int, width : int, life_chance : float, seed : int, rows_per_batch : int = 256) -> np.ndarray:
+    '''
+    Creates a random boolean grid. Same cells as randomPackedCells with the same seed
+
+    :param height: number of rows
+    :type height: int
+    :param width: number of cells on each row
+    :type width: int
+    :param life_chance: chance of a cell being alive
+    :type life_chance: float
+    :param seed: random generation seed
+    :type seed: int
+    :param rows_per_batch: number of rows to draw at once, defaults to 256
+    :type rows_per_batch: int, optional
+    :return: 2D boolean grid where True means alive
+    :rtype: np.ndarray
+    '''
+
+    rng = np.random.default_rng(seed)
+    cells = np.empty((height, width), dtype=bool)
+
+    # Drawn in batches so that the random numbers of the whole grid are never held at once
+    for y in range(0, height, rows_per_batch):
+        rows = min(rows_per_batch, height - y)
+        cells[y:y + rows] = rng.random((rows, width)) < life_chance
+
+    return cells
+
+def randomPackedCells(height : int, width : int, life_chance : float, seed : int, rows_per_batch : int = 256) -> np.ndarray:
+    '''
+    Creates a random packed grid without ever holding the whole grid as bytes. Same cells as randomCells with the same seed
+
+    :param height: number of rows
+    :type height: int
+    :param width: number of cells on each row
+    :type width: int
+    :param life_chance: chance of a cell being alive
+    :type life_chance: float
+    :param seed: random generation seed
+    :type seed: int
+    :param rows_per_batch: number of rows to create at once, defaults to 256
+    :type rows_per_batch: int, optional
+    :return: packed grid
+    :rtype: np.ndarray
+    '''
+
+    rng = np.random.default_rng(seed)
+    packed = np.zeros((height, (width + WORD_BITS - 1) // WORD_BITS), dtype="<u8")
+
+    for y in range(0, height, rows_per_batch):
+        rows = min(rows_per_batch, height - y)
+        packed[y:y + rows] = packCells(rng.random((rows, width)) < life_chance)
+
+    return packed
+
+def shiftWest(rows : np.ndarray) -> np.ndarray:
+    ''' Moves every bit one cell to the east so that each cell holds its western neighbour '''
+
+    shifted = rows << np.uint64(1)
+    shifted[:, 1:] |= rows[:, :-1] >> np.uint64(WORD_BITS - 1)
+    return shifted
+
+def shiftEast(rows : np.ndarray) -> np.ndarray:
+    ''' Moves every bit one cell to the west so that each cell holds its eastern neighbour '''
+
+    shifted = rows >> np.uint64(1)
+    shifted[:, :-1] |= rows[:, 1:] << np.uint64(WORD_BITS - 1)
+    return shifted
+
+def addBits(a : np.ndarray, b : np.ndarray, c : np.ndarray = None):
+    '''
+    Bitwise full adder (half adder if @c is None) applied to 64 cells at once
+
+    :return: sum bits and carry bits
+    :rtype: Tuple[np.ndarray, np.ndarray]
+    '''
+
+    if c is None:
+        return a ^ b, a & b
+
+    partial = a ^ b
+    return partial ^ c, (a & b) | (partial & c)
+
+def countMatches(count_bits : list, counts) -> np.ndarray:
+    '''
+    Returns the cells whose neighbour count is one of the @counts
+
+    :param count_bits: bit planes of the neighbour count, least significant first
+    :type count_bits: List[np.ndarray]
+    :param counts: neighbour counts to match
+    :type counts: Iterable[int]
+    :return: packed grid of the matching cells
+    :rtype: np.ndarray
+    '''
+
+    inverted = [~bits for bits in count_bits]
+    matches = np.zeros_like(count_bits[0])
+
+    for count in counts:
+        match = None
+        for i in range(len(count_bits)):
+            bits = count_bits[i] if (count >> i) & 1 else inverted[i]
+            match = bits if match is None else match & bits
+        matches |= match
+
+    return matches
+
+def stepPackedCells(packed : np.ndarray, width : int, survive_counts, birth_counts) -> np.ndarray:
+    '''
+    Applies one step of the cellular automata to a packed grid.
+    Neighbours are counted with bitwise adders, 64 cells at a time. Cells outside of the grid are dead
+
+    :param packed: packed grid
+    :type packed: np.ndarray
+    :param width: number of cells on each row
+    :type width: int
+    :param survive_counts: neighbour counts that keep an alive cell alive
+    :type survive_counts: Iterable[int]
+    :param birth_counts: neighbour counts that make a dead cell alive
+    :type birth_counts: Iterable[int]
+    :return: new packed grid
+    :rtype: np.ndarray
+    '''
+
+    north = np.zeros_like(packed)
+    north[1:] = packed[:-1]
+    south = np.zeros_like(packed)
+    south[:-1] = packed[1:]
+
+    # 8 neighbours of every cell
+    n0, n1, n2 = shiftWest(north), north, shiftEast(north)
+    n3, n4 = shiftWest(packed), shiftEast(packed)
+    n5, n6, n7 = shiftWest(south), south, shiftEast(south)
+
+    # Sum them into 4 bit planes (count is between 0 and 8)
+    s0, c0 = addBits(n0, n1, n2)
+    s1, c1 = addBits(n3, n4, n5)
+    s2, c2 = addBits(n6, n7)
+    bit0, c3 = addBits(s0, s1, s2)
+    t0, u0 = addBits(c0, c1, c2)
+    bit1, u1 = addBits(t0, c3)
+    bit2, bit3 = addBits(u0, u1)
+    count_bits = [bit0, bit1, bit2, bit3]
+
+    new = (packed & countMatches(count_bits, survive_counts)) | (~packed & countMatches(count_bits, birth_counts))
+
+    # Keep the bits after the last cell dead
+    if width % WORD_BITS != 0:
+        new[:, -1] &= np.uint64((1 << (width % WORD_BITS)) - 1)
+
+    return new
+
+def runPackedCellularAutomata(packed : np.ndarray, width : int, steps : int, rule : AutomataRule, band_rows : int = 256, fused_steps : int = 4) -> np.ndarray:
+    '''
+    Applies @steps steps of the cellular automata to a packed grid.
+    The grid is processed in bands of @band_rows rows and @fused_steps steps are applied to a band 
+    (with @fused_steps rows of halo on both sides) before it is written back, so that the band stays in the cache
+
+    :param packed: packed grid
+    :type packed: np.ndarray
+    :param width: number of cells on each row
+    :type width: int
+    :param steps: number of steps to apply
+    :type steps: int
+    :param rule: rule to apply. Only the moore neighbourhood with dead boundaries is supported
+    :type rule: AutomataRule
+    :param band_rows: number of rows to process at once, defaults to 256
+    :type band_rows: int, optional
+    :param fused_steps: number of steps to apply to a band before writing it back, defaults to 4
+    :type fused_steps: int, optional
+    :raises ValueError: if the rule can't be applied with bitwise adders
+    :return: new packed grid
+    :rtype: np.ndarray
+    '''
+
+    if rule.neighbourhood != "moore" or rule.boundary != "dead":
+        raise ValueError("Packed cellular automata only supports the moore neighbourhood with dead boundaries")
+
+    height = packed.shape[0]
+
+    done = 0
+    while done < steps:
+        fused = min(fused_steps, steps - done)
+        new = np.empty_like(packed)
+
+        for top in range(0, height, band_rows):
+            bottom = min(top + band_rows, height)
+
+            # Halo rows get wrong by one row every step, so after @fused steps the band itself is still correct.
+            # Rows outside of the grid are dead, which is handled by the step itself
+            halo_top = max(0, top - fused)
+            halo_bottom = min(height, bottom + fused)
+
+            band = packed[halo_top:halo_bottom]
+            for _ in range(fused):
+                band = stepPackedCells(band, width, rule.survive, rule.birth)
+
+            new[top:bottom] = band[top - halo_top:bottom - halo_top]
+
+        packed = new
+        done += fused
+
+    return packed
+
+# Shared grids and the rule of the worker process. Set by initAutomataWorker
+worker_grids : List[np.ndarray] = []
+worker_memory : List[shared_memory.SharedMemory] = []
+worker_rule : List[AutomataRule] = []
+
+def initAutomataWorker(memory_names : Tuple[str, str], shape : Tuple[int, int], rule : AutomataRule):
+    '''
+    Attaches the worker process to the shared grids. Called once for every worker process.
+    The grids are detached when the worker exits (see closeAutomataWorker)
+
+    :param memory_names: names of the two shared memory blocks that hold the grids
+    :type memory_names: Tuple[str, str]
+    :param shape: shape of the grids
+    :type shape: Tuple[int, int]
+    :param rule: rule to apply
+    :type rule: AutomataRule
+    '''
+
+    worker_rule.append(rule)
+
+    for name in memory_names:
+        memory = shared_memory.SharedMemory(name=name)
+        worker_memory.append(memory)
+        worker_grids.append(np.ndarray(shape, dtype=bool, buffer=memory.buf))
+
+    # Worker processes exit without running the atexit hooks, multiprocessing runs its finalizers instead
+    util.Finalize(None, closeAutomataWorker, exitpriority=10)
+
+def closeAutomataWorker():
+    ''' Detaches the worker process from the shared grids. The main process unlinks them '''
+
+    # The views have to be released before the blocks can be closed
+    worker_grids.clear()
+
+    for memory in worker_memory:
+        memory.close()
+    worker_memory.clear()
+
+def stepAutomataTile(task : Tuple[int, int, int, int, int]):
+    '''
+    Applies one step of the cellular automata to a tile of the shared grid.
+    Reads the tile and its halo (as wide as the rule's radius) from the current grid and writes the tile to the other one
+
+    :param task: top, bottom, left, right of the tile and the index of the current grid
+    :type task: Tuple[int, int, int, int, int]
+    '''
+
+    top, bottom, left, right, current = task
+    rule = worker_rule[-1]
+
+    window = rule.window(worker_grids[current], top, bottom, left, right)
+    worker_grids[1 - current][top:bottom, left:right] = rule.stepWindow(window)
+
+def runParallelCellularAutomata(cells : np.ndarray, steps : int, rule : AutomataRule, workers : int = None, tile_size : int = 1024) -> np.ndarray:
+    '''
+    Applies @steps steps of the cellular automata by splitting the grid into tiles and stepping them on a process pool.
+    The grid lives in shared memory, so the tiles aren't pickled and the halos of the tiles are 
+    exchanged by reading the neighbouring cells of the previous step from the shared grid
+
+    :param cells: 2D boolean grid where True means alive
+    :type cells: np.ndarray
+    :param steps: number of steps to apply
+    :type steps: int
+    :param rule: rule to apply
+    :type rule: AutomataRule
+    :param workers: number of worker processes, defaults to the number of cpus
+    :type workers: int, optional
+    :param tile_size: size of the tiles in cells, defaults to 1024
+    :type tile_size: int, optional
+    :return: new grid, same as applying @rule.step @steps times
+    :rtype: np.ndarray
+    '''
+
+    height, width = cells.shape
+
+    tiles = [
+        (top, min(top + tile_size, height), left, min(left + tile_size, width))
+        for top in range(0, height, tile_size) 
+        for left in range(0, width, tile_size)
+    ]
+
+    # Current grid and the grid to write the next step to
+    memory = [shared_memory.SharedMemory(create=True, size=max(cells.nbytes, 1)) for _ in range(2)]
+    grids : List[np.ndarray] = []
+
+    try:
+        grids = [np.ndarray(cells.shape, dtype=bool, buffer=block.buf) for block in memory]
+        grids[0][:] = cells
+
+        with ProcessPoolExecutor(workers, initializer=initAutomataWorker, initargs=((memory[0].name, memory[1].name), cells.shape, rule)) as pool:
+            for step in range(steps):
+                current = step % 2
+                tasks = [tile + (current,) for tile in tiles]
+
+                # Waiting for all of the tiles keeps the steps in sync
+                list(pool.map(stepAutomataTile, tasks))
+
+        result = grids[steps % 2].copy()
+    finally:
+        del grids
+        for block in memory:
+            block.close()
+            block.unlink()
+
+    return result
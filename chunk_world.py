@@ -0,0 +1,256 @@
+'''
+Endless worlds made of chunks that are generated when they are first needed.
+
+Every chunk is a dungeon of one of the room generators (see GENERATORS) generated with a seed derived from
+the world seed and the chunk's location, so a chunk is the same no matter when or in which order it's generated.
+Neighbouring chunks are connected through portals: every border between two chunks has a portal at a location
+derived from the world seed and the border. Both of the chunks route a corridor with A* from the portal to their closest room
+(see dungeon_parts.PortalCorridor), so the corridors meet at the border.
+
+Only MAX_LOADED_CHUNKS chunks are kept in memory as tile codes (see Tiles.CODES). The least recently used chunks are
+dropped and generated again if they are needed later
+
+Usage:
+    world = ChunkWorld("experiment_two", seed="WORLD")
+    tile = world.tileAt(-150, 42)
+    codes = world.region(0, 0, 200, 100)
+'''
+
+# Default Modules
+import importlib
+import random
+from collections import OrderedDict
+from typing import List, Tuple
+
+# Licensed Modules
+import numpy as np
+
+# Custom Modules
+from dungeon_parts import Corridor, PortalCorridor, Room
+from dungeon_tiles import TILE_CODES, Tile, Tiles, tilesToCodes
+from path_finding import manhattanPath
+from utilities import Coordinate, generateSeed
+
+# Module -> generator class of the room generators that can be used for the chunks
+GENERATORS = {
+    "experiment_one": "Experiment1",
+    "experiment_two": "Experiment2",
+}
+
+# Number of tiles on both axes of a chunk
+CHUNK_SIZE = 64
+# Max number of chunks kept in memory
+MAX_LOADED_CHUNKS = 64
+# Portals are not placed closer than this to the corners of a chunk
+PORTAL_MARGIN = 4
+
+EMPTY_CODE = TILE_CODES[Tiles.EMPTY_BLOCK]
+WALL_CODE = TILE_CODES[Tiles.WALL]
+PATH_CODE = TILE_CODES[Tiles.PATH]
+
+
+class ChunkWorld():
+    ''' Endless world of lazily generated chunks '''
+
+    def __init__(self, generator_name : str = "experiment_two", seed : str = None, chunk_size : int = CHUNK_SIZE, max_chunks : int = MAX_LOADED_CHUNKS):
+        '''
+        :param generator_name: module of the generator of the chunks (see GENERATORS), defaults to "experiment_two"
+        :type generator_name: str, optional
+        :param seed: seed of the world. If None, a new seed is generated, defaults to None
+        :type seed: str, optional
+        :param chunk_size: number of tiles on both axes of a chunk, defaults to CHUNK_SIZE
+        :type chunk_size: int, optional
+        :param max_chunks: max number of chunks to keep in memory, defaults to MAX_LOADED_CHUNKS
+        :type max_chunks: int, optional
+        '''
+
+        self.generator_name = generator_name
+        self.seed = seed if seed != None else generateSeed()
+        self.chunk_size = chunk_size
+        self.max_chunks = max_chunks
+
+        # (chunk x, chunk y) -> (chunk_size, chunk_size) tile codes, least recently used first
+        self.chunks : OrderedDict = OrderedDict()
+
+        # Number of chunks generated so far, including the ones generated again after being dropped
+        self.generated = 0
+
+    def chunkSeed(self, chunk_x : int, chunk_y : int) -> str:
+        ''' Seed of the chunk's generator '''
+
+        return f"{self.seed}:{chunk_x}:{chunk_y}"
+
+    def portal(self, chunk_x : int, chunk_y : int, vertical : bool) -> int:
+        '''
+        Gets the portal on the border between the chunk and its east (vertical border) or south (horizontal border)
+        neighbour. The portal only depends on the border so both of the chunks find the same portal
+
+        :param chunk_x: chunk on the west/north of the border
+        :type chunk_x: int
+        :param chunk_y: chunk on the west/north of the border
+        :type chunk_y: int
+        :param vertical: True for the border on the east of the chunk, False for the border on the south
+        :type vertical: bool
+        :return: location of the portal along the border
+        :rtype: int
+        '''
+
+        rng = random.Random(f"{self.seed}:portal:{'x' if vertical else 'y'}:{chunk_x}:{chunk_y}")
+        return rng.randint(PORTAL_MARGIN, self.chunk_size - 1 - PORTAL_MARGIN)
+
+    def chunkPortals(self, chunk_x : int, chunk_y : int) -> List[Tuple[Coordinate, bool]]:
+        '''
+        :return: location of every portal in the chunk and if it's on a vertical border
+        :rtype: List[Tuple[Coordinate, bool]]
+        '''
+
+        last = self.chunk_size - 1
+
+        return [
+            (Coordinate(last, self.portal(chunk_x, chunk_y, True)), True),      # East
+            (Coordinate(0, self.portal(chunk_x - 1, chunk_y, True)), True),     # West
+            (Coordinate(self.portal(chunk_x, chunk_y, False), last), False),    # South
+            (Coordinate(self.portal(chunk_x, chunk_y - 1, False), 0), False),   # North
+        ]
+
+    def generateChunk(self, chunk_x : int, chunk_y : int) -> np.ndarray:
+        '''
+        Generates the dungeon of the chunk and connects it to the portals
+
+        :return: (chunk_size, chunk_size) tile codes
+        :rtype: np.ndarray
+        '''
+
+        module = importlib.import_module(self.generator_name)
+
+        generator = getattr(module, GENERATORS[self.generator_name])(seed=self.chunkSeed(chunk_x, chunk_y), width=self.chunk_size, height=self.chunk_size)
+        generator.generate()
+
+        rooms = [part for part in generator.dungeon_parts if isinstance(part, Room)]
+        generator_corridors = [part for part in generator.dungeon_parts if isinstance(part, Corridor)]
+        portals = self.chunkPortals(chunk_x, chunk_y)
+
+        if len(rooms) > 0:
+            corridors : List[PortalCorridor] = []
+
+            for portal, _ in portals:
+                # Connect to the room the portal is on, or to the closest room
+                target = min(rooms, key=lambda room: (not isWithinRoom(portal, room), abs(room.getCenter().X - portal.X) + abs(room.getCenter().Y - portal.Y)))
+
+                # The pathfinding works on the tiles, same as the corridors of the generators
+                generator.dungeonPartsToTiles()
+                corridors.append(PortalCorridor(portal, target, generator.dungeon_tiles, generator_corridors))
+                generator.addDungenPart(corridors[-1])
+
+            # Walls around the corridors, then the parts are projected again for the new doors of the rooms
+            for corridor in corridors:
+                corridor.afterInit(generator.dungeon_tiles)
+            generator.refreshTiles()
+
+        codes = np.frombuffer(tilesToCodes(generator.dungeon_tiles), dtype=np.uint8).reshape(self.chunk_size, self.chunk_size).copy()
+
+        if len(rooms) == 0:
+            # Nothing to route around, connect the portals through the middle of the chunk
+            middle = Coordinate(self.chunk_size // 2, self.chunk_size // 2)
+
+            for portal, vertical in portals:
+                # Leave the border straight so that the corridors of the neighbours meet
+                carveCorridor(codes, manhattanPath(portal, middle) if vertical else manhattanPath(middle, portal))
+
+        self.generated += 1
+
+        return codes
+
+    def chunk(self, chunk_x : int, chunk_y : int) -> np.ndarray:
+        '''
+        Gets the chunk, generates it if it's not in memory
+
+        :return: (chunk_size, chunk_size) tile codes
+        :rtype: np.ndarray
+        '''
+
+        key = (chunk_x, chunk_y)
+
+        codes = self.chunks.get(key)
+        if codes is not None:
+            self.chunks.move_to_end(key)
+            return codes
+
+        codes = self.chunks[key] = self.generateChunk(chunk_x, chunk_y)
+
+        # Drop the least recently used chunks
+        while len(self.chunks) > self.max_chunks:
+            self.chunks.popitem(last=False)
+
+        return codes
+
+    def tileAt(self, x : int, y : int) -> Tile:
+        '''
+        :param x: world location, can be negative
+        :type x: int
+        :param y: world location, can be negative
+        :type y: int
+        :rtype: Tile
+        '''
+
+        codes = self.chunk(x // self.chunk_size, y // self.chunk_size)
+        return Tiles.CODES[codes[y % self.chunk_size, x % self.chunk_size]]
+
+    def region(self, x : int, y : int, width : int, height : int) -> np.ndarray:
+        '''
+        Gets the tile codes of an area of the world, generates the chunks that are not in memory
+
+        :param x: world location of the top left corner
+        :type x: int
+        :param y: world location of the top left corner
+        :type y: int
+        :param width: number of tiles on the X axis
+        :type width: int
+        :param height: number of tiles on the Y axis
+        :type height: int
+        :return: (height, width) tile codes
+        :rtype: np.ndarray
+        '''
+
+        size = self.chunk_size
+        region = np.empty((height, width), dtype=np.uint8)
+
+        for chunk_y in range(y // size, (y + height - 1) // size + 1):
+            for chunk_x in range(x // size, (x + width - 1) // size + 1):
+                codes = self.chunk(chunk_x, chunk_y)
+
+                # Overlap of the chunk and the region in world locations
+                left, right = max(x, chunk_x * size), min(x + width, (chunk_x + 1) * size)
+                top, bottom = max(y, chunk_y * size), min(y + height, (chunk_y + 1) * size)
+
+                region[top - y:bottom - y, left - x:right - x] = codes[top - chunk_y * size:bottom - chunk_y * size, left - chunk_x * size:right - chunk_x * size]
+
+        return region
+
+def isWithinRoom(location : Coordinate, room : Room) -> bool:
+    ''' True if the location is within the bounds of the room, including its walls '''
+
+    return 0 <= location.X - room.pivot_loc.X < room.width and 0 <= location.Y - room.pivot_loc.Y < room.height
+
+def carveCorridor(codes : np.ndarray, path : List[Coordinate]):
+    '''
+    Carves the path into the tile codes of a chunk without rooms. The path goes through the walls of the other paths
+    and gets walls on its sides where it goes through empty tiles
+
+    :param codes: 2D tile codes to change
+    :type codes: np.ndarray
+    :param path: locations to carve
+    :type path: List[Coordinate]
+    '''
+
+    height, width = codes.shape
+
+    for coord in path:
+        codes[coord.Y, coord.X] = PATH_CODE
+
+    # Walls are placed after the whole path is carved so that they don't block the path
+    for coord in path:
+        for y in range(max(coord.Y - 1, 0), min(coord.Y + 2, height)):
+            for x in range(max(coord.X - 1, 0), min(coord.X + 2, width)):
+                if codes[y, x] == EMPTY_CODE:
+                    codes[y, x] = WALL_CODE
@@ -1,19 +1,68 @@
 # Default Modules
+import random
 import sys
-from typing import List
+from typing import Iterator, List, Tuple
 
 # Licensed Modules
-import pygame
+# pygame is only imported when a window is started so that the generation can run without it
 
 # Custom Modules
 from color_constants import Color
 from dungeon_tiles import Tiles, Tile
 from dungeon_parts import Corridor, DungeonPart, Room
-from utilities import Coordinate
+from utilities import Coordinate, generateSeed
+from camera import Camera
+from sparse_tiles import SparseTileGrid
+from budget import GenerationBudget
 
-# Print the todo list
-import todos
 
+class GenerationObserver():
+    '''
+    Gets notified after every stage of the generation.
+    Extend this to visualise or log the generation
+    '''
+
+    def onStage(self, generator, stage : str, data = None):
+        '''
+        Called after a generation stage is finished
+
+        :param generator: generator that has finished the stage
+        :type generator: RogueLikeDefaults
+        :param stage: name of the stage. e.g. "rooms", "connections", "corridors"
+        :type stage: str
+        :param data: extra information about the stage, defaults to None
+        :type data: any, optional
+        '''
+        return
+
+class DisplayObserver(GenerationObserver):
+    ''' Draws every generation stage to the window of the generator '''
+
+    # Time to wait after drawing the stage in ms
+    STAGE_DELAYS = {
+        "rooms": 500,
+        "corridors": 500,
+        "bsp_split": 10
+    }
+
+    def onStage(self, generator, stage : str, data = None):
+        '''
+        Draws the stage and waits a little so that the stage can be seen
+
+        :param generator: generator that has finished the stage
+        :type generator: RogueLikeDefaults
+        :param stage: name of the stage
+        :type stage: str
+        :param data: extra information about the stage, defaults to None
+        :type data: any, optional
+        '''
+
+        import pygame
+
+        generator.drawStage(stage, data)
+        pygame.display.update()
+        pygame.time.delay(self.STAGE_DELAYS.get(stage, 0))
+        return
 
 class RogueLikeDefaults():
     ''' 
@@ -21,7 +70,7 @@ class RogueLikeDefaults():
     Extend this to use the features
     '''
 
-    def __init__(self, height = 50, width = 50, grid_size = 40, fps = 1):
+    def __init__(self, height = 50, width = 50, grid_size = 40, fps = 1, viewport_size : Tuple[int, int] = None, event_driven = False, seed : str = None, sparse_tiles : bool = False, time_limit : float = None):
         '''
         :param height: Number of tiles on the Y axis
         :type height: int, optional
@@ -31,8 +80,31 @@ class RogueLikeDefaults():
         :type grid_size: int, optional
         :param fps: Number of times the UI will be re-drawn in a second, defaults to 1
         :type fps: int, optional
+        :param viewport_size: Size of the window in pixels. If set, the map is drawn through a camera 
+        that can pan (arrow keys, mouse drag) and zoom (mouse wheel), defaults to None
+        :type viewport_size: Tuple[int, int], optional
+        :param event_driven: If True, the UI is only re-drawn after an input or when @update reports changes
+        instead of on every frame, defaults to False
+        :type event_driven: bool, optional
+        :param seed: random generation seed. If None, a new seed is generated, defaults to None
+        :type seed: str, optional
+        :param sparse_tiles: If True, @self.dungeon_tiles is a SparseTileGrid that only allocates the parts of the map
+        that aren't empty. Use it for large maps that are mostly empty, defaults to False
+        :type sparse_tiles: bool, optional
+        :param time_limit: seconds the generation can take, counted from the creation of the generator. The stages take
+        cheaper shortcuts when the time is running out and record them in @self.budget.degradations.
+        If None, there is no limit, defaults to None
+        :type time_limit: float, optional
         '''        
 
+        # Every generator draws from its own random generator instead of the global random module
+        # so that generators in the same process don't change each others results
+        self.seed = seed if seed != None else generateSeed()
+        self.rng = random.Random(self.seed)
+
+        # Time limit of the generation
+        self.budget = GenerationBudget(time_limit)
+
         # Height and width of the display by tiles
         self.height = height
         self.width = width
@@ -44,82 +116,160 @@ class RogueLikeDefaults():
         self.window_height = self.height * self.grid_size
         self.window_width  = self.width  * self.grid_size
 
+        # Camera to draw the map through. Only exists in viewport mode
+        self.camera : Camera = None
+        if viewport_size != None:
+            self.window_width, self.window_height = viewport_size
+            self.camera = Camera(self.window_width, self.window_height, self.grid_size)
+
         # Frame per seconds
         self.FPS = fps
 
+        # Redraw only when something changes
+        self.event_driven = event_driven
+        self.needs_redraw = True
+
         # Dungeon parts
         self.dungeon_parts : List[DungeonPart] = []
+        # The dungeon parts have changed since they were last projected onto the tiles
+        self.parts_changed = True
 
         # Init empty tiles
-        self.dungeon_tiles = [[Tiles.EMPTY_BLOCK] * self.width for _ in range(self.height)] 
+        self.sparse_tiles = sparse_tiles
+        self.dungeon_tiles = self.createTiles()
 
         # Total steps
         self.steps = 0
 
+        # Get notified after every generation stage
+        self.observers : List[GenerationObserver] = []
+
         return
 
     def start(self) :
         ''' Starts the UI and draws tiles '''
 
+        # Licensed Modules
+        import pygame
+        from tile_renderer import TileRenderer
+
         pygame.init()
         self.SCREEN = pygame.display.set_mode((self.window_width, self.window_height))
         self.CLOCK = pygame.time.Clock()
+        self.renderer = TileRenderer(self.grid_size)
         self.SCREEN.fill(Color.BLACK)
 
+        # Visualise the generation stages
+        self.addObserver(DisplayObserver())
+
         # Call the begin function before the main loop
         self.begin()
         
         while True:
-            self.CLOCK.tick(self.FPS)
-            
-            self.SCREEN.fill(Color.BLACK)
+            if self.event_driven:
+                # Sleep until there is an input or it's time to call update again
+                events = self.waitForEvents()
+            else:
+                self.CLOCK.tick(self.FPS)
+                events = pygame.event.get()
+
+                # Project and redraw everything on every tick, update() may change the parts without reporting it.
+                # Only the event driven mode skips the projection while the parts are unchanged
+                self.markPartsChanged()
             
-            # Reset tiles 
-            # (We reset everytime so that if there are any changes we can draw from the begining)
-            if len(self.dungeon_parts) > 0:
-                self.resetTiles()
+            for event in events:
+                # Exit code
+                if event.type == pygame.QUIT:
+                    pygame.quit()
+                    sys.exit()
 
-            # Add dungeon parts to @self.dungeon_tiles
-            self.dungeonPartsToTiles()
+                # Window got uncovered or restored
+                if event.type in (pygame.VIDEOEXPOSE, pygame.WINDOWEXPOSED):
+                    self.requestRedraw()
+                
+                # Pan and zoom
+                if self.camera != None and self.camera.handleEvent(event):
+                    self.requestRedraw()
 
-            # Call drawing methods
-            self.drawTiles()
+            redrawn = self.needs_redraw
+            if redrawn:
+                self.redraw()
 
             # Call update function for extra functions..
-            self.update()  
+            # If it reports changes, the tiles will be projected and drawn again
+            if self.update() == True:
+                self.markPartsChanged()
 
             # Inc steps
             self.steps += 1
-            
-            # Exit code
-            for event in pygame.event.get():
-                if event.type == pygame.QUIT:
-                    pygame.quit()
-                    sys.exit()
 
-            pygame.display.update()
+            if redrawn:
+                pygame.display.update()
 
         return
 
-    def drawTiles(self):
-        ''' Draws the tiles every frame. Don't change this '''
-        for y in range(len(self.dungeon_tiles)):
-            for x in range(len(self.dungeon_tiles[y])):
-                # Get tile
-                tile = self.dungeon_tiles[y][x]
+    def waitForEvents(self) -> list:
+        '''
+        Blocks until an event arrives or 1/FPS seconds pass. Doesn't block if a redraw is pending
 
-                # Apply size reduction based on ratio
-                tile_size = (self.grid_size/100) * tile.size_ratio 
-                
-                # Adjust tile locations and align it to the center based on the size               
-                tile_loc = Coordinate(
-                    (x * self.grid_size) + (self.grid_size - tile_size) / 2,
-                    (y * self.grid_size) + (self.grid_size - tile_size) / 2
-                )
+        :return: events that have arrived
+        :rtype: List[pygame.event.Event]
+        '''
+
+        import pygame
+
+        if self.needs_redraw:
+            return pygame.event.get()
+
+        event = pygame.event.wait(int(1000 / self.FPS))
+        return [event] + pygame.event.get()
+
+    def requestRedraw(self):
+        ''' Marks the screen to be drawn again in the next loop '''
+
+        self.needs_redraw = True
+        return
+
+    def markPartsChanged(self):
+        ''' Marks the dungeon parts to be projected onto the tiles again before the next redraw '''
+
+        self.parts_changed = True
+        self.requestRedraw()
+        return
+
+    def redraw(self):
+        ''' Projects the dungeon parts onto the tiles if they have changed and draws the visible tiles '''
+
+        self.SCREEN.fill(Color.BLACK)
+
+        self.refreshTiles()
+
+        # Call drawing methods
+        self.drawTiles()
+
+        self.needs_redraw = False
+        return
+
+    def refreshTiles(self):
+        ''' Projects the dungeon parts onto new tiles. Does nothing if they haven't changed since the last projection '''
 
-                # Draw the rect
-                rect = pygame.Rect(tile_loc.X, tile_loc.Y, tile_size, tile_size)
-                pygame.draw.rect(self.SCREEN, tile.color, rect)
+        if not self.parts_changed:
+            return
+
+        # Reset tiles
+        # (We reset so that the changes of the parts are drawn from the begining)
+        if len(self.dungeon_parts) > 0:
+            self.resetTiles()
+
+        # Add dungeon parts to @self.dungeon_tiles
+        self.dungeonPartsToTiles()
+
+        self.parts_changed = False
+        return
+
+    def drawTiles(self):
+        ''' Draws the tiles every frame. Don't change this '''
+        self.renderer.drawTiles(self.SCREEN, self.dungeon_tiles, self.camera)
 
         return
 
@@ -128,7 +278,13 @@ class RogueLikeDefaults():
         
         for dungeon_part in self.dungeon_parts:
             tiles = dungeon_part.tiles
-            
+
+            # Only go through the allocated chunks, the rest of the part is ignored
+            if isinstance(tiles, SparseTileGrid) and tiles.default == Tiles.IGNORE:
+                for x, y, tile in tiles.items():
+                    self.dungeon_tiles[y + dungeon_part.pivot_loc.Y][x + dungeon_part.pivot_loc.X] = tile
+                continue
+
             for y in range(len(tiles)):
                 for x in range(len(tiles[y])):
                     # Type casting
@@ -163,11 +319,121 @@ class RogueLikeDefaults():
         # We are doing this call here because room creation happens in the begin function thus
         # operations on self.dungeon_tiles would return empty without the call here (before the initial loop)
         self.dungeonPartsToTiles()
+        self.markPartsChanged()
 
     def resetTiles(self):
         ''' Resets the tiles '''
 
-        self.dungeon_tiles = [[Tiles.EMPTY_BLOCK] * self.width for _ in range(self.height)] 
+        self.dungeon_tiles = self.createTiles()
+        return
+
+    def createTiles(self) -> List[List[Tile]]:
+        '''
+        Creates empty tiles of the map size
+
+        :return: SparseTileGrid if @self.sparse_tiles is set, otherwise 2D list of tiles
+        :rtype: List[List[Tile]]
+        '''
+
+        if self.sparse_tiles:
+            return SparseTileGrid(self.width, self.height)
+
+        return [[Tiles.EMPTY_BLOCK] * self.width for _ in range(self.height)]
+
+    def generate(self) -> List[List[Tile]]:
+        '''
+        Runs the generation without opening a window
+
+        :return: generated dungeon tiles
+        :rtype: List[List[Tile]]
+        '''
+
+        for _ in self.iterGenerate():
+            pass
+
+        return self.dungeon_tiles
+
+    def iterGenerate(self) -> Iterator[Tuple[str, object]]:
+        '''
+        Runs the generation without opening a window and yields the results as they are created,
+        so that they can be used before the whole dungeon is generated. See iterStages for the events.
+        The last event is ("tiles", generated dungeon tiles)
+
+        :return: (name of the event, data of the event)
+        :rtype: Iterator[Tuple[str, object]]
+        '''
+
+        yield from self.iterStages()
+
+        # Same as the first frame of the UI. The stages can change the parts without adding them (e.g. restored by a pipeline)
+        self.parts_changed = True
+        self.refreshTiles()
+
+        yield ("tiles", self.dungeon_tiles)
+
+    def iterStages(self) -> Iterator[Tuple[str, object]]:
+        '''
+        Runs the stages of @begin and yields their results. Runs begin without yielding anything by default,
+        extend this to stream the stages
+
+        :return: (name of the event, data of the event)
+        :rtype: Iterator[Tuple[str, object]]
+        '''
+
+        self.begin()
+
+        yield from ()
+
+    def stageRandom(self, stage : str) -> random.Random:
+        '''
+        Creates a random generator seeded from @self.seed and the name of the stage.
+        A stage draws the same numbers for a seed no matter how many numbers the other stages draw
+
+        :param stage: name of the stage
+        :type stage: str
+        :return: random generator of the stage
+        :rtype: random.Random
+        '''
+
+        return random.Random(f"{self.seed}:{stage}")
+
+    def addObserver(self, observer : GenerationObserver):
+        '''
+        Add an observer to be notified after every generation stage
+
+        :param observer: observer to add
+        :type observer: GenerationObserver
+        '''
+
+        self.observers.append(observer)
+        return
+
+    def notifyStage(self, stage : str, data = None):
+        '''
+        Notifies the observers that a generation stage is finished. Does nothing if there are no observers
+
+        :param stage: name of the stage
+        :type stage: str
+        :param data: extra information about the stage, defaults to None
+        :type data: any, optional
+        '''
+
+        for observer in self.observers:
+            observer.onStage(self, stage, data)
+        return
+
+    def drawStage(self, stage : str, data = None):
+        '''
+        Draws the given generation stage. Draws the tiles by default,
+        extend this to visualise the stages differently
+
+        :param stage: name of the stage
+        :type stage: str
+        :param data: extra information about the stage, defaults to None
+        :type data: any, optional
+        '''
+
+        self.drawTiles()
         return
 
     def begin(self):
@@ -177,6 +443,7 @@ class RogueLikeDefaults():
 
     def update(self):
         '''Will be called every frame. If you want to do 
-        changes dynamically in every frame, extend this function'''
+        changes dynamically in every frame, extend this function.
+        In the event driven mode, return True if something has changed and the tiles need to be drawn again'''
         
         return
@@ -0,0 +1,240 @@
+'''
+Binary dungeon file format.
+
+Layout:
+    MAGIC                   8 bytes
+    version                 uint32 (little-endian)
+    header length           uint32 (little-endian)
+    header                  UTF-8 JSON, padded to SECTION_ALIGNMENT
+    sections                raw little-endian arrays, every section starts at a multiple of SECTION_ALIGNMENT
+
+The header has the size, seed, generator, constants, degradations, tile table and the offset, dtype and shape of every section.
+Sections:
+    tiles       uint8 (height, width) tile codes, see Tiles.CODES
+    rooms       ROOM_DTYPE, location and size of every room
+    doors       DOOR_DTYPE, world location of every door and the index of its room
+    paths       POINT_DTYPE, locations of all of the corridor paths one after another
+    path_index  PATH_DTYPE, where every corridor path starts in paths, its length and the rooms it connects
+
+Files are loaded with numpy.memmap, sections are views of the mapped file so nothing is read until it's accessed
+'''
+
+# Default Modules
+import json
+import struct
+from typing import Dict, List, Tuple
+
+# Licensed Modules
+import numpy as np
+
+# Custom Modules
+from dungeon_parts import Corridor, Room
+from dungeon_tiles import Tile, Tiles, codesToTiles, tilesToCodes
+
+MAGIC = b"DUNGEON\0"
+VERSION = 1
+# Sections start at a multiple of this many bytes
+SECTION_ALIGNMENT = 64
+
+ROOM_DTYPE = np.dtype([("x", "<i4"), ("y", "<i4"), ("width", "<i4"), ("height", "<i4")])
+DOOR_DTYPE = np.dtype([("x", "<i4"), ("y", "<i4"), ("room", "<i4")])
+POINT_DTYPE = np.dtype([("x", "<i4"), ("y", "<i4")])
+PATH_DTYPE = np.dtype([("start", "<i8"), ("length", "<i8"), ("room1", "<i4"), ("room2", "<i4")])
+
+# Magic, version and header length
+PREFIX = struct.Struct("<8sII")
+
+
+def alignOffset(offset : int) -> int:
+    ''' Rounds the offset up to the next multiple of SECTION_ALIGNMENT '''
+
+    return -(-offset // SECTION_ALIGNMENT) * SECTION_ALIGNMENT
+
+def collectSections(generator) -> Dict[str, np.ndarray]:
+    '''
+    Converts the tiles, rooms, doors and corridors of the generator to arrays
+
+    :param generator: generator that has generated a dungeon
+    :type generator: RogueLikeDefaults
+    :return: section name -> array
+    :rtype: Dict[str, np.ndarray]
+    '''
+
+    tiles = generator.dungeon_tiles
+    codes = np.frombuffer(tilesToCodes(tiles), dtype=np.uint8).reshape(len(tiles), len(tiles[0]))
+
+    rooms = [part for part in generator.dungeon_parts if isinstance(part, Room)]
+    corridors = [part for part in generator.dungeon_parts if isinstance(part, Corridor)]
+
+    # Parts are compared by identity, same as everywhere else
+    room_indices = {id(room) : index for index, room in enumerate(rooms)}
+
+    room_array = np.array([(room.pivot_loc.X, room.pivot_loc.Y, room.width, room.height) for room in rooms], dtype=ROOM_DTYPE)
+
+    # Door locations are relative to the room
+    door_array = np.array([
+        (room.pivot_loc.X + door.location.X, room.pivot_loc.Y + door.location.Y, index)
+        for index, room in enumerate(rooms) for door in room.doors
+    ], dtype=DOOR_DTYPE)
+
+    points : List[Tuple[int, int]] = []
+    path_index = []
+    for corridor in corridors:
+        path = corridor.corridor_path or []
+        path_index.append((len(points), len(path), room_indices.get(id(corridor.start_room), -1), room_indices.get(id(corridor.end_room), -1)))
+        points += [(coord.X, coord.Y) for coord in path]
+
+    return {
+        "tiles": codes,
+        "rooms": room_array,
+        "doors": door_array,
+        "paths": np.array(points, dtype=POINT_DTYPE),
+        "path_index": np.array(path_index, dtype=PATH_DTYPE),
+    }
+
+def saveDungeon(path : str, generator, constants : Dict[str, object] = None):
+    '''
+    Saves the generated dungeon of the generator
+
+    :param path: file to write to
+    :type path: str
+    :param generator: generator that has generated a dungeon
+    :type generator: RogueLikeDefaults
+    :param constants: constants the dungeon was generated with, defaults to None
+    :type constants: Dict[str, object], optional
+    '''
+
+    writeDungeon(path, collectSections(generator), {
+        "generator": type(generator).__name__,
+        "seed": generator.seed,
+        "constants": constants or {},
+        # Shortcuts taken to stay within the time limit (see budget.py)
+        "degradations": generator.budget.degradations,
+    })
+
+def writeDungeon(path : str, sections : Dict[str, np.ndarray], info : Dict[str, object]):
+    '''
+    Writes the sections with a header
+
+    :param path: file to write to
+    :type path: str
+    :param sections: section name -> array. Must have a 2D uint8 "tiles" section
+    :type sections: Dict[str, np.ndarray]
+    :param info: generator, seed and constants to save to the header
+    :type info: Dict[str, object]
+    '''
+
+    height, width = sections["tiles"].shape
+    header = dict(info, width=width, height=height, tile_table=Tiles.CHARACTERS, sections={})
+
+    # Header size depends on the offsets and the offsets depend on the header size,
+    # so leave room for the offsets and retry if the header grows past it
+    data_start = SECTION_ALIGNMENT * 16
+    while True:
+        offset = data_start
+        for name, array in sections.items():
+            # Structured arrays are saved with their fields
+            dtype = array.dtype.descr if array.dtype.names != None else array.dtype.str
+            header["sections"][name] = {"offset": offset, "dtype": dtype, "shape": list(array.shape)}
+            offset = alignOffset(offset + array.nbytes)
+
+        header_bytes = json.dumps(header).encode("utf-8")
+        if PREFIX.size + len(header_bytes) <= data_start:
+            break
+        data_start = alignOffset(PREFIX.size + len(header_bytes))
+
+    with open(path, "wb") as file:
+        file.write(PREFIX.pack(MAGIC, VERSION, len(header_bytes)))
+        file.write(header_bytes)
+
+        for name, array in sections.items():
+            file.seek(header["sections"][name]["offset"])
+            file.write(np.ascontiguousarray(array).tobytes())
+
+        # Pad the last section
+        file.truncate(max(offset, file.tell()))
+
+class DungeonFile():
+    '''
+    Memory mapped dungeon file. Sections are read-only numpy views of the file
+    and are only read from the disk when they are accessed
+    '''
+
+    def __init__(self, path : str):
+        '''
+        :param path: file to load
+        :type path: str
+        :raises ValueError: if the file is not a dungeon file or has an unknown version
+        '''
+
+        self.path = path
+        self.data = np.memmap(path, dtype=np.uint8, mode="r")
+
+        magic, version, header_length = PREFIX.unpack(self.data[:PREFIX.size].tobytes())
+        if magic != MAGIC:
+            raise ValueError(f"{path} is not a dungeon file")
+        if version != VERSION:
+            raise ValueError(f"{path} has an unknown version {version}")
+
+        self.header : Dict[str, object] = json.loads(self.data[PREFIX.size:PREFIX.size + header_length].tobytes().decode("utf-8"))
+
+        self.width : int = self.header["width"]
+        self.height : int = self.header["height"]
+        self.seed : str = self.header["seed"]
+
+    def section(self, name : str) -> np.ndarray:
+        '''
+        :param name: name of the section
+        :type name: str
+        :return: view of the section
+        :rtype: np.ndarray
+        '''
+
+        info = self.header["sections"][name]
+        dtype = np.dtype([tuple(field) for field in info["dtype"]]) if isinstance(info["dtype"], list) else np.dtype(info["dtype"])
+        count = int(np.prod(info["shape"]))
+
+        return self.data[info["offset"]:info["offset"] + count * dtype.itemsize].view(dtype).reshape(info["shape"])
+
+    @property
+    def codes(self) -> np.ndarray:
+        ''' (height, width) tile codes '''
+        return self.section("tiles")
+
+    @property
+    def rooms(self) -> np.ndarray:
+        return self.section("rooms")
+
+    @property
+    def doors(self) -> np.ndarray:
+        return self.section("doors")
+
+    def corridorPath(self, index : int) -> np.ndarray:
+        '''
+        :param index: index of the corridor
+        :type index: int
+        :return: locations of the corridor's path
+        :rtype: np.ndarray
+        '''
+
+        entry = self.section("path_index")[index]
+        return self.section("paths")[entry["start"]:entry["start"] + entry["length"]]
+
+    def tiles(self) -> List[List[Tile]]:
+        '''
+        :return: 2D matrix of tiles, can be assigned to RogueLikeDefaults.dungeon_tiles
+        :rtype: List[List[Tile]]
+        '''
+
+        return codesToTiles(self.codes.tobytes(), self.width)
+
+def loadDungeon(path : str) -> DungeonFile:
+    '''
+    Opens a dungeon file created by saveDungeon
+
+    :param path: file to load
+    :type path: str
+    :rtype: DungeonFile
+    '''
+
+    return DungeonFile(path)
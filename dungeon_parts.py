@@ -1,13 +1,14 @@
 # Default Modules
 from typing import List
-from random import randrange
+import random
 import copy
 
 # Custom Modules
 from color_constants import Color
 from dungeon_tiles import Tile, Tiles
 from utilities import Coordinate, checkAlignedBlocks, debugTile, globalToRelative, isWithinBounds
-from path_finding import aStar
+from path_finding import aStar, manhattanPath
+from sparse_tiles import SparseTileGrid
 
 class DungeonPart():
     '''
@@ -210,10 +211,17 @@ class Room(DungeonPart):
 
         return wall_locations
 
-    def createRandomDoor(self) -> Door:
+    def createRandomDoor(self, rng : random.Random = None) -> Door:
         '''
         Creates doors on random locations around the walls based on the @self.num_rooms
+
+        :param rng: random generator to draw the door locations from, defaults to the global random module
+        :type rng: random.Random, optional
         '''
+
+        if rng == None:
+            rng = random
+
         # Number of tries
         tries = 0
 
@@ -225,7 +233,7 @@ class Room(DungeonPart):
 
         # Select random door locations
         while (tries < self.MAX_DOOR_PLACEMENT_TRIES):
-            random_loc = randrange(0, len(wall_locations))
+            random_loc = rng.randrange(0, len(wall_locations))
             check_loc = wall_locations[random_loc]
   
             # Don't add door if the door is not placable or a door is already added to that location
@@ -332,8 +340,8 @@ class Corridor(DungeonPart):
         # Assign dungeon tiles
         self.dungeon_tiles = dungeon_tiles
 
-        # Adjust tiles size
-        self.tiles = [[Tiles.IGNORE] * len(self.dungeon_tiles[0]) for _ in range(len(self.dungeon_tiles))]
+        # Adjust tiles size. Only the chunks around the path are allocated
+        self.tiles = SparseTileGrid(len(self.dungeon_tiles[0]), len(self.dungeon_tiles), default=Tiles.IGNORE)
 
         # Create the corridor
         self.createCorridor()
@@ -457,13 +465,8 @@ class Corridor(DungeonPart):
         Extend this create the corridor by filling its shape in @self.tiles
         '''
     
-        # Remove start and end rooms from the tiles for the astar so that it will ignore the both of the rooms
-        # However, keep the corner pieces in because we don't want connection from corner pieces
-        self.removeRoomPieces(self.start_room)
-        self.removeRoomPieces(self.end_room)
-
         # Get the corridor path
-        self.corridor_path = aStar(self.start_room.getCenter(), self.end_room.getCenter(), [], self.dungeon_tiles)
+        self.corridor_path = self.findPath()
         
         # self.corridor_path = [path for path in temp_corridor_path if self.isWithinRooms(path.X, path.Y) == False]
 
@@ -487,6 +490,21 @@ class Corridor(DungeonPart):
         for coord in self.corridor_path:
             self.tiles[coord.Y][coord.X] = Tiles.PATH
 
+    def findPath(self) -> List[Coordinate]:
+        '''
+        Finds the path from the center of the start room to the center of the end room with A*
+
+        :return: path including the parts within the rooms
+        :rtype: List[Coordinate]
+        '''
+
+        # Remove start and end rooms from the tiles for the astar so that it will ignore the both of the rooms
+        # However, keep the corner pieces in because we don't want connection from corner pieces
+        self.removeRoomPieces(self.start_room)
+        self.removeRoomPieces(self.end_room)
+
+        return aStar(self.start_room.getCenter(), self.end_room.getCenter(), [], self.dungeon_tiles)
+
     def placeCorridor(self):
         # Place Tiles to the given coordiantes
         for coord in self.corridor_path:
@@ -508,3 +526,126 @@ class Corridor(DungeonPart):
                             if self.tiles[coord_to_place.Y][coord_to_place.X] == Tiles.IGNORE:
                                 self.tiles[coord_to_place.Y][coord_to_place.X] = Tiles.WALL
 
+class StraightCorridor(Corridor):
+    '''
+    Corridor made of straight lines on the X and Y axes instead of an A* path.
+    Much cheaper but it can go through the other dungeon parts. Used when the generation is running out of time
+    '''
+
+    def findPath(self) -> List[Coordinate]:
+        '''
+        :return: path from the center of the start room to the center of the end room including the parts within the rooms
+        :rtype: List[Coordinate]
+        '''
+
+        start = self.start_room.getCenter()
+        goal = self.end_room.getCenter()
+
+        # Bend of the Z shaped paths
+        bend_x = Coordinate((start.X + goal.X) // 2, goal.Y)
+        bend_y = Coordinate(goal.X, (start.Y + goal.Y) // 2)
+
+        # A path can run along the wall of a room and leave the door on its corner, try the other shapes then
+        candidates = [
+            manhattanPath(start, goal),                                             # X then Y
+            manhattanPath(goal, start)[::-1],                                       # Y then X
+            manhattanPath(start, bend_x) + manhattanPath(bend_x, goal)[1:],         # X, Y then X
+            manhattanPath(bend_y, start)[::-1] + manhattanPath(bend_y, goal)[1:],   # Y, X then Y
+        ]
+
+        for path in candidates:
+            if not self.hasCornerDoor(path):
+                return path
+
+        return candidates[0]
+
+    def hasCornerDoor(self, path : List[Coordinate]) -> bool:
+        '''
+        :param path: path from the start room to the end room
+        :type path: List[Coordinate]
+        :return: True if the path leaves the start room or enters the end room from a corner
+        :rtype: bool
+        '''
+
+        exits = [coord for coord in path if self.isWithinRoom(coord.X, coord.Y, self.start_room)]
+        entries = [coord for coord in path if self.isWithinRoom(coord.X, coord.Y, self.end_room)]
+
+        return isRoomCorner(exits[-1], self.start_room) or isRoomCorner(entries[0], self.end_room)
+
+class PortalCorridor(Corridor):
+    '''
+    Corridor from a location on the map (e.g. a portal on the border of a chunk, see chunk_world.py) to a room.
+    Routed with A* the same way as Corridor and enters the room through a single door that is not on a corner.
+    The path can go through the walls of the other corridors and follow them to the room
+    '''
+
+    def __init__(self, start : Coordinate, end_room : Room, dungeon_tiles: List[List[Tiles]], corridors : List[Corridor] = []):
+        '''
+        :param start: world location the corridor starts from
+        :type start: Coordinate
+        :param end_room: room to connect
+        :type end_room: Room
+        :param dungeon_tiles: Global dungeon tiles
+        :type dungeon_tiles: List[List[Tiles]]
+        :param corridors: corridors the path can join, defaults to []
+        :type corridors: List[Corridor], optional
+        '''
+
+        self.start = start
+        self.corridors = corridors
+
+        Corridor.__init__(self, None, end_room, dungeon_tiles)
+
+    def isWithinRooms(self, x: int, y: int) -> bool:
+        ''' There is no start room, only checks the end room '''
+        return self.isWithinRoom(x, y, self.end_room)
+
+    def createCorridor(self):
+        ''' Gets called during __init__. Cuts the path where it enters the room and places the door there '''
+
+        self.corridor_path = self.findPath()
+
+        # First tile of the path within the room. The start can be on the corner of the room, the path goes along the wall then
+        entry = next((index for index, coord in enumerate(self.corridor_path) if self.isWithinRoom(coord.X, coord.Y, self.end_room) and not isRoomCorner(coord, self.end_room)), None)
+        if entry == None:
+            print("Couldn't reach the destination")
+            self.corridor_path = []
+            return
+
+        self.createDoorAtRoom(self.corridor_path[entry], self.end_room)
+        self.corridor_path = self.corridor_path[:entry]
+
+        # Place Tiles to the given coordiantes
+        for coord in self.corridor_path:
+            self.tiles[coord.Y][coord.X] = Tiles.PATH
+
+    def findPath(self) -> List[Coordinate]:
+        '''
+        Finds the path from the start to the center of the room with A*
+
+        :return: path including the part within the room
+        :rtype: List[Coordinate]
+        '''
+
+        # Let the A* go through the walls of the room but not through its corners
+        self.removeRoomPieces(self.end_room)
+
+        # The start can be closed in by the walls of the corridors, let the A* join them instead
+        for corridor in self.corridors:
+            for x, y, tile in corridor.tiles.items():
+                if tile == Tiles.WALL and self.dungeon_tiles[y][x] == Tiles.WALL:
+                    self.dungeon_tiles[y][x] = Tiles.SOFT_IGNORE_WALL
+
+        return aStar(self.start, self.end_room.getCenter(), [], self.dungeon_tiles)
+
+def isRoomCorner(location : Coordinate, room : Room) -> bool:
+    '''
+    :param location: world location
+    :type location: Coordinate
+    :param room: room to check
+    :type room: Room
+    :return: True if the location is one of the corners of the room
+    :rtype: bool
+    '''
+
+    return location.X in (room.pivot_loc.X, room.pivot_loc.X + room.width - 1) and location.Y in (room.pivot_loc.Y, room.pivot_loc.Y + room.height - 1)
@@ -1,3 +1,6 @@
+# Default Modules
+from typing import List
+
 # Custom Modules
 from color_constants import Color
 
@@ -12,9 +15,13 @@ class Tile():
         
         @color: color of the block
         '''
-        self.size_ratio = max(min(size_ratio, 100), 1) # Clamp to value between 1 and 100 
+        self.size_ratio = max(min(size_ratio, 100), 1) # Clamp to value between 1 and 100
         self.color = color
 
+    def __deepcopy__(self, memo):
+        ''' Tiles are compared by identity, copies of the dungeons must keep the same tile constants '''
+        return self
+
 class Tiles():
     ''' 
     Tile constants to be used in creating the dungeon.
@@ -30,4 +37,44 @@ class Tiles():
 
     # Tile groups
     BLOCKING_TILES = [WALL, DOOR]
-    SAFE_TILES = [IGNORE, EMPTY_BLOCK, PATH]
\ No newline at end of file
+    SAFE_TILES = [IGNORE, EMPTY_BLOCK, PATH]
+
+    # Tiles that can be saved. The index of a tile is its code
+    CODES = [EMPTY_BLOCK, WALL, PATH, DOOR]
+    # Character of every code, used to save the dungeons as text
+    CHARACTERS = " #.+"
+
+# Tile -> code. Tiles that look the same as a saved tile share its code
+TILE_CODES = {tile : code for code, tile in enumerate(Tiles.CODES)}
+TILE_CODES[Tiles.SOFT_IGNORE_WALL] = TILE_CODES[Tiles.WALL]
+TILE_CODES[Tiles.IGNORE] = TILE_CODES[Tiles.EMPTY_BLOCK]
+
+def tilesToCodes(tiles : List[List[Tile]]) -> bytes:
+    '''
+    Converts the tiles to their codes (see Tiles.CODES)
+
+    :param tiles: 2D matrix of tiles
+    :type tiles: List[List[Tile]]
+    :return: code of every tile in row-major order
+    :rtype: bytes
+    '''
+
+    # Sparse grids only convert their allocated chunks (see sparse_tiles.py)
+    if hasattr(tiles, "toCodes"):
+        return tiles.toCodes()
+
+    return bytes(TILE_CODES[tile] for row in tiles for tile in row)
+
+def codesToTiles(codes : bytes, width : int) -> List[List[Tile]]:
+    '''
+    Converts the codes created by tilesToCodes back to tiles
+
+    :param codes: code of every tile in row-major order
+    :type codes: bytes
+    :param width: number of tiles on the X axis
+    :type width: int
+    :return: 2D matrix of tiles
+    :rtype: List[List[Tile]]
+    '''
+
+    return [[Tiles.CODES[code] for code in codes[y:y + width]] for y in range(0, len(codes), width)]
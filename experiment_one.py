@@ -1,19 +1,15 @@
 # Default Modules
-import string
-from typing import List
-import random 
-
-# Copyrighted Modules
-import pygame
+from typing import Iterator, List, Tuple
 
 # Custom Modules
 from dungeon_defaults import RogueLikeDefaults
 from color_constants import Color
 from dungeon_tiles import Tiles
-from dungeon_parts import CustomRoom, DungeonPart, Room, Corridor, Door
+from dungeon_parts import CustomRoom, DungeonPart, Room, Corridor, Door, StraightCorridor
 from utilities import Coordinate, MinMax, debugTile, isWithinBounds
 from path_finding import distancePythagorean
 from triangulation import Edge, delaunayTriangulation
+from pipeline import MAX_MEMOIZED_RESULTS, Pipeline, Stage
 
 # Max number of tries to place a room
 MAX_PLACEMANT_TRIES = 500
@@ -22,58 +18,103 @@ MAX_PLACEMANT_TRIES = 500
 NUM_ROOMS = MinMax(25,30)
 ROOM_WIDTH = MinMax(4,15)
 ROOM_HEIGHT = MinMax(4,15)
+# Rooms that are placed even if the time limit is over. The triangulation needs at least 3 rooms
+MIN_ROOMS = 3
+# Chance of a loop connection between the rooms
+CHANCE_OF_LOOP = 0.2
+# Share of the time limit the room placement can take, the rest of the rooms are skipped
+ROOMS_TIME_SHARE = 0.3
+# Loops are skipped if this share of the time limit has passed before the connections
+LOOPS_TIME_SHARE = 0.5
 
 # Engine Spesifics
 HEIGHT = 80
 WIDTH = 80
 GRID_SIZE = 15
 FPS = 10
+# Store the tiles in a SparseTileGrid, use it for large maps that are mostly empty
+SPARSE_TILES = False
+# Size of the window in pixels, e.g. (800, 600). If set, the map is drawn through a camera that can pan and zoom
+VIEWPORT_SIZE = None
+# Only redraw after an input or when update() reports changes instead of on every frame
+EVENT_DRIVEN = False
  
-# Random generation seed
-SEED = ''.join(random.SystemRandom().choice(string.ascii_uppercase + string.digits) for _ in range(8))
-print ("CURRENT SEED:", SEED)
+# Version of the generation. Bump it when a seed starts to generate a different dungeon
+# so that the cached dungeons of the old version are not used
+GENERATOR_VERSION = 1
+# Constants that change the generated dungeon. Cached dungeons are keyed on them (see generation_cache.py),
+# display and time limit constants are left out
+GENERATION_CONSTANTS = ["MAX_PLACEMANT_TRIES", "NUM_ROOMS", "ROOM_WIDTH", "ROOM_HEIGHT", "CHANCE_OF_LOOP", "HEIGHT", "WIDTH"]
+
+# Random generation seed. If None, a new seed is generated for every dungeon
+SEED = None
 
 class Experiment1(RogueLikeDefaults):
     '''Simpe Room Placement, A* pathfinding, Delaunay Triangulation'''
     
-    def __init__(self, num_rooms: int = 0, custom_rooms: List[CustomRoom] = []):
+    def __init__(self, num_rooms: int = 0, custom_rooms: List[CustomRoom] = [], seed: str = None, pipeline: Pipeline = None, time_limit: float = None, width: int = None, height: int = None):
         '''
         @num_rooms: number of randomly generated rooms to create and place on the map.
         if set, will ignore @custom_rooms
         @custom_rooms: custom rooms to place on the map
+        @seed: random generation seed, defaults to SEED
+        @pipeline: stages of the generation. Share a pipeline created by createPipeline between generators
+        to reuse the results of the stages that haven't changed, defaults to a pipeline without memoization
+        @time_limit: seconds the generation can take. The stages take shortcuts to stay within it
+        and record them in self.budget.degradations, defaults to no limit
+        @width: number of tiles on the X axis, defaults to WIDTH
+        @height: number of tiles on the Y axis, defaults to HEIGHT
         
         '''
 
-        # Random gen seed
-        random.seed(SEED)
-
         RogueLikeDefaults.__init__(self,
-            height=HEIGHT,
-            width=WIDTH,
+            height=height if height != None else HEIGHT,
+            width=width if width != None else WIDTH,
             grid_size=GRID_SIZE,
-            fps=FPS)
+            fps=FPS,
+            viewport_size=VIEWPORT_SIZE,
+            event_driven=EVENT_DRIVEN,
+            seed=seed if seed != None else SEED,
+            sparse_tiles=SPARSE_TILES,
+            time_limit=time_limit)
 
         # Setting up room settings
-        self.num_rooms = random.randint(NUM_ROOMS.MIN, NUM_ROOMS.MAX)
+        self.num_rooms = self.rng.randint(NUM_ROOMS.MIN, NUM_ROOMS.MAX)
         self.custom_rooms = custom_rooms
         self.triangulation = []
+        self.paths : List[Edge] = []
+
+        self.pipeline = pipeline if pipeline != None else createPipeline(max_results=0)
         
 
     def createRooms(self):
         ''' Create rooms '''
+
+        for _ in self.iterRooms():
+            pass
+
+    def iterRooms(self):
+        ''' Same as createRooms but yields ("room", room) after every placed room '''
         # Number of tries
         tries = 0
         rooms_created = 0
 
+        rng = self.stageRandom("rooms")
+
         # Place rooms until enough rooms have been placed.
         # Will try to place a room @MAX_PLACEMANT_TRIES times and if it's still not a sucess it will 
         # stop placing rooms. The @tries gets reseted after every successfull placement.
         while rooms_created < self.num_rooms and tries < MAX_PLACEMANT_TRIES:
-            r_width = random.randint(ROOM_WIDTH.MIN, ROOM_WIDTH.MAX)
-            r_height = random.randint(ROOM_HEIGHT.MIN, ROOM_HEIGHT.MAX)
+            # Accept fewer rooms if the time is running out
+            if rooms_created >= MIN_ROOMS and self.budget.isOver(ROOMS_TIME_SHARE):
+                self.budget.degrade("fewer_rooms")
+                break
+
+            r_width = rng.randint(ROOM_WIDTH.MIN, ROOM_WIDTH.MAX)
+            r_height = rng.randint(ROOM_HEIGHT.MIN, ROOM_HEIGHT.MAX)
             
-            r_x = random.randint(0, (self.width - r_width))
-            r_y = random.randint(0, (self.height - r_height))
+            r_x = rng.randint(0, (self.width - r_width))
+            r_y = rng.randint(0, (self.height - r_height))
 
             rand_room = Room(r_x, r_y, r_height, r_width)
             
@@ -85,6 +126,8 @@ class Experiment1(RogueLikeDefaults):
                 self.addDungenPart(rand_room)
                 rooms_created += 1
 
+                yield ("room", rand_room)
+
                 # Reset the number of tries
                 tries = 0
 
@@ -93,10 +136,6 @@ class Experiment1(RogueLikeDefaults):
             if isinstance(part,Room):
                 part.afterInit(self.dungeon_tiles)
 
-        # Update the viewport
-        self.drawTiles()
-        pygame.display.update()
-
     def matchCoordinateWithRoom(self, coord : Coordinate) -> Room:
         '''
         Returns the room with the given pivot location
@@ -121,14 +160,26 @@ class Experiment1(RogueLikeDefaults):
         
     def findRoomConnections(self):
         ''' Decide on the routes to be connected '''
+
+        for _ in self.iterRoomConnections():
+            pass
+
+    def iterRoomConnections(self):
+        ''' Same as findRoomConnections but yields ("triangulation", triangles) before the routes are picked '''
         
-        # Chance of loop connection
-        chance_of_loop = 0.2
+        rng = self.stageRandom("connections")
+
+        # Loops are extra corridors, skip them if the time is running out
+        chance_of_loop = CHANCE_OF_LOOP
+        if chance_of_loop > 0 and self.budget.isOver(LOOPS_TIME_SHARE):
+            chance_of_loop = 0
+            self.budget.degrade("no_loops")
 
         # Adjust the room cordinates based on the grid size
         room_coordinates : List[Coordinate] = [Coordinate(part.pivot_loc.X, part.pivot_loc.Y) for part in self.dungeon_parts if isinstance(part, Room)]
         # Form a delaunay triangulation from the room locations
         self.triangulation = delaunayTriangulation(room_coordinates)
+        yield ("triangulation", self.triangulation)
 
         # Extract all the edges from the triangulation
         all_edges : List[Edge] = []
@@ -148,7 +199,7 @@ class Experiment1(RogueLikeDefaults):
             # Potential paths to be taken from visited nodes
             potential_paths : List[Edge] = []
             # If true next path might be a loop too (without crossing the same path)
-            is_loop_allowed = random.random() < chance_of_loop
+            is_loop_allowed = rng.random() < chance_of_loop
 
             # Find reachable verticies from the visited nodes and calculate their distances
             for edge in all_edges:
@@ -198,6 +249,9 @@ class Experiment1(RogueLikeDefaults):
     def drawRoomConnections(self):
         ''' Draw room connections '''
 
+        # Licensed Modules
+        import pygame
+
         for triangle in self.triangulation:
             for edge in triangle.edges:
                 # Adjust the locations based on the grid to draw them properly
@@ -215,11 +269,15 @@ class Experiment1(RogueLikeDefaults):
 
             pygame.draw.circle(self.SCREEN , Color.WHITE, p1, 5)
             pygame.draw.circle(self.SCREEN , Color.WHITE, p2, 5)
-        
-        pygame.display.update()
  
     def createCorridors(self):
         ''' Creates corridors '''
+
+        for _ in self.iterCorridors():
+            pass
+
+    def iterCorridors(self):
+        ''' Same as createCorridors but yields ("corridor", corridor) after every routed corridor '''
     
         for path in self.paths:
             rooms : List[Room] = (self.matchCoordinateWithRoom(path.p1), self.matchCoordinateWithRoom(path.p2))
@@ -232,19 +290,22 @@ class Experiment1(RogueLikeDefaults):
             # Since the tile checks on the pathfinding algorithm are based on dungeon 
             self.dungeonPartsToTiles()
 
-            corridor = Corridor(rooms[0], rooms[1], self.dungeon_tiles)
+            # Use the cheaper routing once the time is over
+            if self.budget.isOver():
+                self.budget.degrade("straight_corridors")
+                corridor = StraightCorridor(rooms[0], rooms[1], self.dungeon_tiles)
+            else:
+                corridor = Corridor(rooms[0], rooms[1], self.dungeon_tiles)
 
             self.addDungenPart(corridor)
 
+            yield ("corridor", corridor)
+
         # Update the rooms
         for part in self.dungeon_parts:
             if isinstance(part,Corridor):
                 part.afterInit(self.dungeon_tiles)
 
-        # Update the viewport
-        self.drawTiles()
-        pygame.display.update()
-
     def canPlace(self, part_to_place: DungeonPart) -> bool:
         '''
         Checks if a DungeonPart can be placed to the given @x, @y location
@@ -271,35 +332,58 @@ class Experiment1(RogueLikeDefaults):
         
         return True  
 
-    def begin(self):
-        # Create the rooms
-        self.createRooms() 
-
-        # Wait a little
-        pygame.time.delay(500)
-
-        # Make connections
-        self.findRoomConnections()
+    def drawStage(self, stage : str, data = None):
+        # Draw the connections over the rooms
+        if stage == "connections":
+            self.drawRoomConnections()
+            return
 
-        # Draw room connections
-        self.drawRoomConnections()
+        RogueLikeDefaults.drawStage(self, stage, data)
 
-        # Create the corridors
-        self.createCorridors()
+    def begin(self):
+        # Create the rooms, make the connections and create the corridors
+        self.pipeline.run(self)
 
-        # Wait a little
-        pygame.time.delay(500)
+        return
 
-        # Erase the lines
-        self.SCREEN.fill(Color.BLACK)
+    def iterStages(self) -> Iterator[Tuple[str, object]]:
+        '''
+        Same as begin but yields ("room", room) after every placed room, ("triangulation", triangles),
+        ("corridor", corridor) after every routed corridor and (stage, None) after every stage
+        '''
 
-        return
+        return self.pipeline.iterRun(self)
 
     def update(self):
         return
-        
+
+def createPipeline(max_results : int = MAX_MEMOIZED_RESULTS) -> Pipeline:
+    '''
+    Creates the stages of Experiment1: rooms -> connections -> corridors
+
+    :param max_results: max number of stage results to memoize, defaults to MAX_MEMOIZED_RESULTS
+    :type max_results: int, optional
+    :rtype: Pipeline
+    '''
+
+    return Pipeline([
+        Stage("rooms", Experiment1.iterRooms,
+            outputs=["dungeon_parts", "dungeon_tiles"],
+            params=lambda generator: {"seed": generator.seed, "width": generator.width, "height": generator.height,
+                "sparse_tiles": generator.sparse_tiles, "num_rooms": generator.num_rooms, "MAX_PLACEMANT_TRIES": MAX_PLACEMANT_TRIES,
+                "ROOM_WIDTH": ROOM_WIDTH, "ROOM_HEIGHT": ROOM_HEIGHT}),
+        Stage("connections", Experiment1.iterRoomConnections,
+            inputs=["dungeon_parts"],
+            outputs=["triangulation", "paths"],
+            params=lambda generator: {"seed": generator.seed, "CHANCE_OF_LOOP": CHANCE_OF_LOOP}),
+        Stage("corridors", Experiment1.iterCorridors,
+            inputs=["dungeon_parts", "dungeon_tiles", "paths"],
+            outputs=["dungeon_parts", "dungeon_tiles"]),
+    ], max_results)
+
 def main():
     ex = Experiment1(NUM_ROOMS)
+    print ("CURRENT SEED:", ex.seed)
     ex.start()
 
 if __name__ == "__main__":
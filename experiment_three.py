@@ -1,21 +1,19 @@
 # Default Modules
 import sys
 import copy
-import string
-from typing import List
-import random 
+from typing import List, Tuple
 
-# Copyrighted Modules
-import pygame
+# Licensed Modules
+import numpy as np
 
 # Custom Modules
 from dungeon_defaults import RogueLikeDefaults
-from color_constants import Color
-from dungeon_tiles import Tiles
 from dungeon_parts import CustomRoom, DungeonPart, Room, Corridor, Door
-from utilities import Coordinate, Directions, MinMax, SquareArea, checkAlignedBlocks, debugTile, getPercentage, isWithinBounds, percentageDifference
-from path_finding import distancePythagorean
+from utilities import Coordinate, MinMax, SquareArea, checkAlignedBlocks, debugTile, getPercentage, percentageDifference
+from path_finding import distancePythagorean, manhattanPath
 from triangulation import Edge, delaunayTriangulation
+from cellular_automata import AutomataRule, cellsToTiles, packCells, randomCells, randomPackedCells, runPackedCellularAutomata, runParallelCellularAutomata, unpackCells, upsampleCells
+from regions import RegionIndex, findRegionConnections
 
 # CONSTANTS
 
@@ -27,177 +25,196 @@ STARVE_LIMIT = 2
 BIRTH_LIMIT = 5
 # Number of steps to apply the algorithm
 NUMBER_OF_STEPS = 10
+# Life-like rule in B/S notation (e.g. "B678/S345678"). If None, it's created from STARVE_LIMIT and BIRTH_LIMIT
+AUTOMATA_RULE = None
+# "moore", "von_neumann" or "moore_radius_2"
+NEIGHBOURHOOD = "moore"
+# What the cells outside of the map count as. "dead", "alive" or "wrap"
+BOUNDARY = "dead"
+# "vectorized" applies the steps one by one on a byte per cell grid.
+# "packed" stores the cells as bits and fuses the steps, but the steps in between can't be drawn
+# "parallel" steps tiles of the grid on all of the cpus, the steps in between can't be drawn either
+AUTOMATA_BACKEND = "vectorized"
+# Multi-resolution mode. Runs COARSE_STEPS on a grid COARSE_FACTOR times smaller, upsamples it,
+# re-rolls REFINE_NOISE of the cells and finishes with REFINE_STEPS at full resolution
+# (instead of NUMBER_OF_STEPS) with the selected backend. 1 disables it
+COARSE_FACTOR = 1
+COARSE_STEPS = 8
+REFINE_STEPS = 3
+REFINE_NOISE = 0.5
+# Carve tunnels between the closest cells of the separated areas so that the whole cave is connected
+CONNECT_AREAS = True
+# Share of the time limit after which the refine steps left are skipped in the multi-resolution mode.
+# Only the vectorized backend applies the steps one by one
+REFINE_TIME_SHARE = 0.5
+# Share of the time limit after which the tunnels are skipped, the areas stay separated
+CONNECT_TIME_SHARE = 1.0
 
 # Engine Spesifics
 HEIGHT = 100
 WIDTH = 100
 GRID_SIZE = 5
 FPS = 10
+# Size of the window in pixels, e.g. (800, 600). If set, the map is drawn through a camera that can pan and zoom
+VIEWPORT_SIZE = None
+# Only redraw after an input or when update() reports changes instead of on every frame
+EVENT_DRIVEN = False
  
+# Version of the generation. Bump it when a seed starts to generate a different dungeon
+# so that the cached dungeons of the old version are not used
+GENERATOR_VERSION = 2
+# Constants that change the generated dungeon. Cached dungeons are keyed on them (see generation_cache.py),
+# display and time limit constants are left out
+GENERATION_CONSTANTS = ["START_LIFE_CHANCE", "STARVE_LIMIT", "BIRTH_LIMIT", "NUMBER_OF_STEPS", "AUTOMATA_RULE", "NEIGHBOURHOOD",
+    "BOUNDARY", "AUTOMATA_BACKEND", "COARSE_FACTOR", "COARSE_STEPS", "REFINE_STEPS", "REFINE_NOISE", "CONNECT_AREAS", "HEIGHT", "WIDTH"]
+
 # Random generation seed
-SEED = "YOK1RL1R"#''.join(random.SystemRandom().choice(string.ascii_uppercase + string.digits) for _ in range(8))
-print ("CURRENT SEED:", SEED)
+SEED = "YOK1RL1R"
 
 class Experiment3(RogueLikeDefaults):
     '''Cellular Automata'''
     
-    def __init__(self):
-        # Random gen seed
-        random.seed(SEED)
+    def __init__(self, seed: str = None, time_limit: float = None):
+        '''
+        @seed: random generation seed, defaults to SEED
+        @time_limit: seconds the generation can take. The stages take shortcuts to stay within it
+        and record them in self.budget.degradations, defaults to no limit
+        '''
 
         RogueLikeDefaults.__init__(self,
             height=HEIGHT,
             width=WIDTH,
             grid_size=GRID_SIZE,
-            fps=FPS)
+            fps=FPS,
+            viewport_size=VIEWPORT_SIZE,
+            event_driven=EVENT_DRIVEN,
+            seed=seed if seed != None else SEED,
+            time_limit=time_limit)
+
+        # Ends of the tunnels that connect the areas
+        self.tunnels : List[Tuple[Tuple[int, int], Tuple[int, int]]] = []
+
+        # Alive cells of the automata. True = Tiles.PATH, False = Tiles.WALL
+        self.cells = np.zeros((self.height, self.width), dtype=bool)
+
+        # Region label of every cell. 0 = wall, regions are labeled from 1. Area i is the region labeled i+1,
+        # its tiles are self.regions.tilesOf(i + 1)
+        self.regions = RegionIndex.fromCells(self.cells)
+
+        # Compiled automata rule
+        if AUTOMATA_RULE != None:
+            self.rule = AutomataRule(AUTOMATA_RULE, NEIGHBOURHOOD, BOUNDARY)
+        else:
+            self.rule = AutomataRule.fromLimits(STARVE_LIMIT, BIRTH_LIMIT, NEIGHBOURHOOD, BOUNDARY)
 
-        self.areas : List[List[Coordinate]]= []
-        self.start_locations : List[Coordinate] = []
+    def lifeSeed(self) -> int:
+        ''' Seed of the initial life, drawn from the "life" stage so that every backend starts with the same cells '''
+
+        return self.stageRandom("life").getrandbits(64)
 
     def startLife(self):
-        for y in range(len(self.dungeon_tiles)):
-            for x in range(len(self.dungeon_tiles[y])):
-                if random.random() <= START_LIFE_CHANCE:
-                    self.start_locations.append(Coordinate(x,y))
-                    self.dungeon_tiles[y][x] = Tiles.PATH
+        ''' Fills @self.cells with random life '''
 
-    def begin(self):
-        # Init dungeon with walls
-        self.dungeon_tiles = [[Tiles.WALL] * self.width for _ in range(self.height)] 
+        self.cells = randomCells(self.height, self.width, START_LIFE_CHANCE, self.lifeSeed())
+
+    def startCoarseLife(self):
+        ''' Lets the large scale structure settle on a COARSE_FACTOR times smaller grid and upsamples it to @self.cells '''
+
+        coarse = randomCells(-(-self.height // COARSE_FACTOR), -(-self.width // COARSE_FACTOR), START_LIFE_CHANCE, self.lifeSeed())
 
-        # Init life on tiles
-        self.startLife()
+        for _ in range(COARSE_STEPS):
+            coarse = self.rule.step(coarse)
+
+        # Noise is drawn with numpy for speed, seeded from the generation seed
+        noise_rng = np.random.default_rng(self.stageRandom("refine_noise").getrandbits(64))
+        self.cells = upsampleCells(coarse, COARSE_FACTOR, self.height, self.width, REFINE_NOISE, noise_rng, START_LIFE_CHANCE)
+
+    def begin(self):
+        # Init life on tiles. The packed backend draws the life straight into the bits
+        steps = NUMBER_OF_STEPS
+        if COARSE_FACTOR > 1:
+            self.startCoarseLife()
+            steps = REFINE_STEPS
+        elif AUTOMATA_BACKEND != "packed":
+            self.startLife()
 
         # Apply celular automata for given steps
-        for i in range(NUMBER_OF_STEPS):
-            self.celularAutomata()
-            
-            # Update the viewport
-            self.SCREEN.fill(Color.BLACK)
-            self.drawTiles()
-            pygame.display.update()
-
-        print("a")
+        if AUTOMATA_BACKEND == "packed":
+            if COARSE_FACTOR > 1:
+                packed = packCells(self.cells)
+            else:
+                packed = randomPackedCells(self.height, self.width, START_LIFE_CHANCE, self.lifeSeed())
+
+            # The grid stays packed until the steps are done
+            packed = runPackedCellularAutomata(packed, self.width, steps, self.rule)
+            self.cells = unpackCells(packed, self.width)
+        elif AUTOMATA_BACKEND == "parallel":
+            self.cells = runParallelCellularAutomata(self.cells, steps, self.rule)
+        else:
+            for i in range(steps):
+                # The coarse grid already has the large scale structure, the refine steps only smooth it
+                if COARSE_FACTOR > 1 and self.budget.isOver(REFINE_TIME_SHARE):
+                    self.budget.degrade("fewer_refine_steps")
+                    break
+
+                self.celularAutomata()
+                
+                # Notify the observers. Tiles are only needed for drawing the steps in between
+                if len(self.observers) > 0:
+                    self.dungeon_tiles = cellsToTiles(self.cells)
+                    self.notifyStage("automata_step", i)
+
         # self.createArea(Coordinate(3,2))
         self.findAreas()
-        
-        print(len(self.areas))
-        '''for area in self.areas:
-            debugTile(self.dungeon_tiles, multiple_points=area, multiple_points_mark="⛝")'''
 
-        return
+        if CONNECT_AREAS:
+            if self.budget.isOver(CONNECT_TIME_SHARE):
+                self.budget.degrade("no_tunnels")
+            else:
+                self.connectAreas()
 
-    def floodFill(self, location : Coordinate):
-        area : List[Coordinate] = []
-        can_check : List[Coordinate] = [location]
-        self.area_tiles[location.Y][location.X] == Tiles.WALL
+        # The cells are projected onto the tiles once they are final
+        self.dungeon_tiles = cellsToTiles(self.cells)
 
-        while True:
-            if len(can_check) == 0:
-                break
+        return
 
-            temp_check = can_check[:]
-            can_check = []
-            
-            for loc in temp_check:
-                area.append(loc)
+    def isPartOfArea(self, location : Coordinate) -> List[int]:
+        '''
+        :return: index of the area the location is part of (region label - 1), empty if it's a wall
+        :rtype: List[int]
+        '''
 
-                for dir in Directions:
-                    next_step : Coordinate = loc + dir.value
+        label = self.regions.labelAt(location.X, location.Y)
+        return [label - 1] if label != 0 else []
 
-                    # Problem cases
-                    if not isWithinBounds(next_step, self.area_tiles) or self.area_tiles[next_step.Y][next_step.X] == Tiles.WALL:
-                        continue
-                    
-                    if not next_step in can_check: 
-                        can_check.append(next_step)
+    def findAreas(self):
+        ''' Labels the connected floor regions of @self.cells '''
 
-                self.area_tiles[loc.Y][loc.X] = Tiles.WALL
-        
-        return area
-                
-    def isPartOfArea(self, location : Coordinate):
-        areas = []
-        for i in range(len(self.areas)):
-            for loc in self.areas[i]:
-                if loc == location:
-                    areas.append(i)
-                    break
-        
-        return areas
+        self.regions = RegionIndex.fromCells(self.cells)
 
-    def findAreas(self):
-        self.area_tiles = [[tile for tile in row] for row in self.dungeon_tiles]
+    def connectAreas(self):
+        ''' Connects the areas with the shortest set of tunnels (minimum spanning tree over the closest cells of the areas) '''
 
-        for curr_loc in self.start_locations:
-            if self.area_tiles[curr_loc.Y][curr_loc.X] != Tiles.WALL:
-                # area = self.createArea(curr_loc, [])
-                area = self.floodFill(curr_loc)
+        self.tunnels = findRegionConnections(self.regions)
 
-                if len(area) > 0:
-                    self.areas.append(area)
-                    # debugTile(self.area_tiles)
-        
-        print("Finish")
+        for start, goal in self.tunnels:
+            for loc in manhattanPath(Coordinate(*start), Coordinate(*goal)):
+                self.cells[loc.Y][loc.X] = True
 
-    def celularAutomata(self):
-        self.new_tiles = [[Tiles.WALL] * self.width for _ in range(self.height)] 
-
-        for y in range(len(self.dungeon_tiles)):
-            for x in range(len(self.dungeon_tiles[y])): 
-                num_alive = self.numAliveNeighbours(Coordinate(x,y))
-
-                '''print("Num alive:", num_alive)
-                debugTile(self.dungeon_tiles, Coordinate(x,y), single_point_mark="⛝")'''
-
-                # Alive rules
-                if self.dungeon_tiles[y][x] == Tiles.PATH:
-                    # Any live cell with fewer than STARVE_LIMIT live neighbours dies, as if by underpopulation.
-                    if num_alive <= STARVE_LIMIT:
-                        self.new_tiles[y][x] = Tiles.WALL
-                    else:
-                        self.new_tiles[y][x] = Tiles.PATH
-                
-                # Dead rules
-                else:
-                    # Any dead cell with STARVE_LIMIT or OVERPOP_LIMIT live neighbours becomes a live cell, as if by reproduction.
-                    if num_alive >= BIRTH_LIMIT:
-                        self.new_tiles[y][x] = Tiles.PATH
-                    else:
-                        self.new_tiles[y][x] = Tiles.WALL
-
-        # Update the dungeon tiles
-        self.dungeon_tiles = self.new_tiles
-        return
+        if len(self.observers) > 0:
+            self.dungeon_tiles = cellsToTiles(self.cells)
+            self.notifyStage("area_connections")
 
-    def numAliveNeighbours(self, location : Coordinate) -> int:
-        ''' Returns number of alive neighbours the coordinate has
+        # Everything is a single area now, no need to label the regions again
+        self.regions = RegionIndex.fromConnectedCells(self.cells)
 
-        :param location: location to check for alive neighbours
-        :type location: Coordinate
-        :return: number of alive neighbours
-        :rtype: int
-        '''        
-        num_alive = 0
+    def celularAutomata(self):
+        ''' Applies one step of the cellular automata to @self.cells '''
 
-        for y in range(-1,2):
-            for x in range(-1,2):
-                # Location to check
-                check_loc = location + Coordinate(x,y)
-                
-                # Ignore if out of bounds
-                if not isWithinBounds(check_loc, self.dungeon_tiles):
-                    continue
-                
-                # Ignore if center block
-                if x == 0 and y == 0:
-                    continue
-                
-                # Check if block is alive
-                if self.dungeon_tiles[check_loc.Y][check_loc.X] == Tiles.PATH:
-                    num_alive += 1
-                
-        return num_alive
+        # By default alive cells with STARVE_LIMIT or less alive neighbours die, 
+        # dead cells with BIRTH_LIMIT or more alive neighbours become alive
+        self.cells = self.rule.step(self.cells)
+        return
 
     def update(self):
         # debugTile(self.dungeon_tiles)
@@ -208,6 +225,7 @@ class Experiment3(RogueLikeDefaults):
         
 def main():
     ex = Experiment3()
+    print ("CURRENT SEED:", ex.seed)
     ex.start()
 
 if __name__ == "__main__":
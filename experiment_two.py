@@ -1,23 +1,17 @@
 # Default Modules
 import copy
-import string
-from typing import List
-import random 
-
-# Copyrighted Modules
-import pygame
+from typing import Iterator, List, Tuple
 
 # Custom Modules
 from dungeon_defaults import RogueLikeDefaults
 from color_constants import Color
 from dungeon_tiles import Tiles
-from dungeon_parts import CustomRoom, DungeonPart, Room, Corridor, Door
-from utilities import Coordinate, MinMax, SquareArea, debugTile, getPercentage, isWithinBounds, percentageDifference
+from dungeon_parts import CustomRoom, DungeonPart, Room, Corridor, Door, StraightCorridor
+from utilities import Coordinate, MinMax, SquareArea, debugTile, getPercentage, isWithinBounds
 from path_finding import distancePythagorean
 from triangulation import Edge, delaunayTriangulation
-
-# Max number of tries to place a room
-MAX_PLACEMANT_TRIES = 500
+from pipeline import MAX_MEMOIZED_RESULTS, Pipeline, Stage
+from bsp import BSPTree
 
 # Rooom Spesifics
 NUM_ROOMS = MinMax(25,30)
@@ -25,147 +19,144 @@ ROOM_WIDTH = MinMax(8,15)
 ROOM_HEIGHT = MinMax(8,15)
 PARTITION_MARGIN = 10
 
+# Chance of a loop connection between the rooms
+CHANCE_OF_LOOP = 0.2
+# Loops are skipped if this share of the time limit has passed before the connections
+LOOPS_TIME_SHARE = 0.5
 
 # Engine Spesifics
 HEIGHT = 80
 WIDTH = 80
 GRID_SIZE = 15
 FPS = 10
+# Store the tiles in a SparseTileGrid, use it for large maps that are mostly empty
+SPARSE_TILES = False
+# Size of the window in pixels, e.g. (800, 600). If set, the map is drawn through a camera that can pan and zoom
+VIEWPORT_SIZE = None
+# Only redraw after an input or when update() reports changes instead of on every frame
+EVENT_DRIVEN = False
  
-# Random generation seed
-SEED = ''.join(random.SystemRandom().choice(string.ascii_uppercase + string.digits) for _ in range(8))
-print ("CURRENT SEED:", SEED)
+# Version of the generation. Bump it when a seed starts to generate a different dungeon
+# so that the cached dungeons of the old version are not used
+GENERATOR_VERSION = 1
+# Constants that change the generated dungeon. Cached dungeons are keyed on them (see generation_cache.py),
+# display and time limit constants are left out
+GENERATION_CONSTANTS = ["NUM_ROOMS", "ROOM_WIDTH", "ROOM_HEIGHT", "PARTITION_MARGIN", "CHANCE_OF_LOOP", "HEIGHT", "WIDTH"]
+
+# Random generation seed. If None, a new seed is generated for every dungeon
+SEED = None
 
 class Experiment2(RogueLikeDefaults):
     '''Binary Space Partitioning, A* pathfinding, Delaunay Triangulation'''
     
-    def __init__(self, num_rooms: int = 0, custom_rooms: List[CustomRoom] = []):
+    def __init__(self, num_rooms: int = 0, custom_rooms: List[CustomRoom] = [], seed: str = None, pipeline: Pipeline = None, time_limit: float = None, width: int = None, height: int = None):
         '''
         @num_rooms: number of randomly generated rooms to create and place on the map.
         if set, will ignore @custom_rooms
         @custom_rooms: custom rooms to place on the map
+        @seed: random generation seed, defaults to SEED
+        @pipeline: stages of the generation. Share a pipeline created by createPipeline between generators
+        to reuse the results of the stages that haven't changed, defaults to a pipeline without memoization
+        @time_limit: seconds the generation can take. The stages take shortcuts to stay within it
+        and record them in self.budget.degradations, defaults to no limit
+        @width: number of tiles on the X axis, defaults to WIDTH
+        @height: number of tiles on the Y axis, defaults to HEIGHT
         
         '''
 
-        # Random gen seed
-        random.seed(SEED)
-
         RogueLikeDefaults.__init__(self,
-            height=HEIGHT,
-            width=WIDTH,
+            height=height if height != None else HEIGHT,
+            width=width if width != None else WIDTH,
             grid_size=GRID_SIZE,
-            fps=FPS)
+            fps=FPS,
+            viewport_size=VIEWPORT_SIZE,
+            event_driven=EVENT_DRIVEN,
+            seed=seed if seed != None else SEED,
+            sparse_tiles=SPARSE_TILES,
+            time_limit=time_limit)
 
         # Setting up room settings
-        self.num_rooms = random.randint(NUM_ROOMS.MIN, NUM_ROOMS.MAX)
+        self.num_rooms = self.rng.randint(NUM_ROOMS.MIN, NUM_ROOMS.MAX)
         self.custom_rooms = custom_rooms
         self.triangulation = []
+        self.paths : List[Edge] = []
+
+        self.pipeline = pipeline if pipeline != None else createPipeline(max_results=0)
 
+        # Partitions of the map
+        self.bsp : BSPTree = None
         # Possible locatations to place rooms
         self.possible_room_areas : List[SquareArea] = []
         
 
-    def binarySpacePartitioning(self, area : SquareArea):
+    def binarySpacePartitioning(self, width : int, height : int):
         '''
-        Is a method for recursively subdividing a space into two convex sets by using hyperplanes as partitions.
+        Is a method for subdividing a space into two convex sets by using hyperplanes as partitions.
+        The leaves of the partition become the possible room areas
 
-        :param area: Area to devide
-        :type area: SquareArea
-        '''        
-
-        rect = pygame.Rect(area.location.X * GRID_SIZE, area.location.Y * GRID_SIZE,area.width * GRID_SIZE,area.height* GRID_SIZE)
-        pygame.draw.rect(self.SCREEN, Color.RED, rect, 1, 0)
-        pygame.display.update()
-        pygame.time.delay(10)
+        :param width: width of the area to divide
+        :type width: int
+        :param height: height of the area to divide
+        :type height: int
+        '''
 
-        # Check if the area fits to be a room.
         # + percentage is for leaving more space for room movement
-        if area.height <= ROOM_HEIGHT.MAX + getPercentage(ROOM_HEIGHT.MAX, 30) and area.width <= ROOM_WIDTH.MAX + getPercentage(ROOM_WIDTH.MAX, 30):
-            # Add this area as a possible room
-            self.possible_room_areas.append(area)
-            return
+        self.bsp = BSPTree.build(width, height,
+            ROOM_WIDTH.MAX + getPercentage(ROOM_WIDTH.MAX, 30),
+            ROOM_HEIGHT.MAX + getPercentage(ROOM_HEIGHT.MAX, 30),
+            rng=self.stageRandom("bsp"))
 
-        # 0 = Vertical, 1 = Horizontal 
-        split_decision = random.randint(0,1)
-        
-        # If partitians are too wide or long
-        if percentageDifference(area.height, area.width) >= 25:
-            area.child_squares = area.splitHorizontally(25)
-        elif percentageDifference(area.width, area.height) >= 25:
-            area.child_squares = area.splitVertically(25)
-        # If not go with the random splitting
-        else:
-            # Also check if spliting the room will end up with too tiny rooms
-            if split_decision == 1:
-                area.child_squares = area.splitHorizontally(25)
-            else:
-                area.child_squares = area.splitVertically(25)
+        self.possible_room_areas = self.bsp.leafAreas()
 
-        # Partition the child areas
-        for square in area.child_squares:
-            self.binarySpacePartitioning(square)
+        # Replay the splits for the observers
+        if len(self.observers) > 0:
+            for node in self.bsp.preorder():
+                self.notifyStage("bsp_split", self.bsp.area(node))
 
-        
     def createRooms(self):
         ''' Create rooms '''
-        # Number of tries
-        tries = 0
-        rooms_created = 0
 
-        # Create a area of the dungteon_tiles
-        whole_map : SquareArea = SquareArea(
-            Coordinate(0,0),
-            self.width,
-            self.height
-        )
+        for _ in self.iterRooms():
+            pass
+
+    def iterRooms(self):
+        ''' Same as createRooms but yields ("room", room) after every placed room '''
 
         # Apply BSP to partition the map into smaller areas
-        self.binarySpacePartitioning(whole_map)
-
-        # Place rooms until enough rooms have been placed.
-        # Will try to place a room @MAX_PLACEMANT_TRIES times and if it's still not a sucess it will 
-        # stop placing rooms. The @tries gets reseted after every successfull placement.
-        while rooms_created < self.num_rooms and tries < MAX_PLACEMANT_TRIES:
-            # Get a random area
-            room_area : SquareArea = random.choice(self.possible_room_areas)
-            
-            # Skip if the partitian is too small for placement. We need the room_width to me 2 tile bigger than the
-            # room_width.min so that we can leave empty spaces around the room for corridors
-            if room_area.width < ROOM_WIDTH.MIN + 2 or room_area.height < ROOM_HEIGHT.MIN + 2 :
-                continue
+        self.binarySpacePartitioning(self.width, self.height)
+
+        rng = self.stageRandom("rooms")
+
+        # Skip the partitions that are too small for placement. We need the room_width to me 2 tile bigger than the
+        # room_width.min so that we can leave empty spaces around the room for corridors
+        valid_areas = [area for area in self.possible_room_areas if area.width >= ROOM_WIDTH.MIN + 2 and area.height >= ROOM_HEIGHT.MIN + 2]
+
+        # Pick a different partition for every room. Partitions don't overlap so the rooms can't clash
+        # Sorting keeps the rooms in the order of the partitions
+        picked = sorted(rng.sample(range(len(valid_areas)), min(self.num_rooms, len(valid_areas))))
+
+        for index in picked:
+            room_area = valid_areas[index]
 
             # We want the room to be within the area and leave a empty line around the border
             # Thats why we deduct 2 from the room's size (one from begining, one from end)
-            r_width = random.randint(ROOM_WIDTH.MIN, min(room_area.width, ROOM_WIDTH.MAX) - 2)
-            r_height = random.randint(ROOM_HEIGHT.MIN, min(room_area.height, ROOM_HEIGHT.MAX) - 2)
+            r_width = rng.randint(ROOM_WIDTH.MIN, min(room_area.width, ROOM_WIDTH.MAX) - 2)
+            r_height = rng.randint(ROOM_HEIGHT.MIN, min(room_area.height, ROOM_HEIGHT.MAX) - 2)
 
             # Get random location within the partition
-            r_x = room_area.location.X + random.randint(1, (room_area.width - r_width) - 1)
-            r_y = room_area.location.Y + random.randint(1, (room_area.height - r_height) - 1)
+            r_x = room_area.location.X + rng.randint(1, (room_area.width - r_width) - 1)
+            r_y = room_area.location.Y + rng.randint(1, (room_area.height - r_height) - 1)
 
-            # +1 is for avoiding clashing walls
-            rand_room = Room(r_x, r_y, r_height, r_width)
-            
-            # Increase the number of tries
-            tries += 1
+            room = Room(r_x, r_y, r_height, r_width)
+            self.addDungenPart(room)
 
-            # Add the created room if it's placeable
-            if self.canPlace(rand_room) == True:
-                self.addDungenPart(rand_room)
-                rooms_created += 1
-
-                # Reset the number of tries
-                tries = 0
+            yield ("room", room)
 
         # Update the rooms
         for part in self.dungeon_parts:
             if isinstance(part,Room):
                 part.afterInit(self.dungeon_tiles)
 
-        # Update the viewport
-        self.drawTiles()
-        pygame.display.update()
-
 
     def matchCoordinateWithRoom(self, coord : Coordinate) -> Room:
         '''
@@ -191,14 +182,26 @@ class Experiment2(RogueLikeDefaults):
         
     def findRoomConnections(self):
         ''' Decide on the routes to be connected '''
+
+        for _ in self.iterRoomConnections():
+            pass
+
+    def iterRoomConnections(self):
+        ''' Same as findRoomConnections but yields ("triangulation", triangles) before the routes are picked '''
         
-        # Chance of loop connection
-        chance_of_loop = 0.2
+        rng = self.stageRandom("connections")
+
+        # Loops are extra corridors, skip them if the time is running out
+        chance_of_loop = CHANCE_OF_LOOP
+        if chance_of_loop > 0 and self.budget.isOver(LOOPS_TIME_SHARE):
+            chance_of_loop = 0
+            self.budget.degrade("no_loops")
 
         # Adjust the room cordinates based on the grid size
         room_coordinates : List[Coordinate] = [Coordinate(part.pivot_loc.X, part.pivot_loc.Y) for part in self.dungeon_parts if isinstance(part, Room)]
         # Form a delaunay triangulation from the room locations
         self.triangulation = delaunayTriangulation(room_coordinates)
+        yield ("triangulation", self.triangulation)
 
         # Extract all the edges from the triangulation
         all_edges : List[Edge] = []
@@ -218,7 +221,7 @@ class Experiment2(RogueLikeDefaults):
             # Potential paths to be taken from visited nodes
             potential_paths : List[Edge] = []
             # If true next path might be a loop too (without crossing the same path)
-            is_loop_allowed = random.random() < chance_of_loop
+            is_loop_allowed = rng.random() < chance_of_loop
 
             # Find reachable verticies from the visited nodes and calculate their distances
             for edge in all_edges:
@@ -268,6 +271,9 @@ class Experiment2(RogueLikeDefaults):
     def drawRoomConnections(self):
         ''' Draw room connections '''
 
+        # Licensed Modules
+        import pygame
+
         for triangle in self.triangulation:
             for edge in triangle.edges:
                 # Adjust the locations based on the grid to draw them properly
@@ -285,13 +291,16 @@ class Experiment2(RogueLikeDefaults):
 
             pygame.draw.circle(self.SCREEN , Color.WHITE, p1, 5)
             pygame.draw.circle(self.SCREEN , Color.WHITE, p2, 5)
-        
-        # Update the display so that the drawings can be seen
-        pygame.display.update()
  
     def createCorridors(self):
         ''' Creates corridors '''
 
+        for _ in self.iterCorridors():
+            pass
+
+    def iterCorridors(self):
+        ''' Same as createCorridors but yields ("corridor", corridor) after every routed corridor '''
+
         for path in self.paths:
             rooms : List[Room] = (self.matchCoordinateWithRoom(path.p1), self.matchCoordinateWithRoom(path.p2))
             
@@ -303,19 +312,22 @@ class Experiment2(RogueLikeDefaults):
             # Since the tile checks on the pathfinding algorithm are based on dungeon 
             self.dungeonPartsToTiles()
 
-            corridor = Corridor(rooms[0], rooms[1], self.dungeon_tiles)
+            # Use the cheaper routing once the time is over
+            if self.budget.isOver():
+                self.budget.degrade("straight_corridors")
+                corridor = StraightCorridor(rooms[0], rooms[1], self.dungeon_tiles)
+            else:
+                corridor = Corridor(rooms[0], rooms[1], self.dungeon_tiles)
 
             self.addDungenPart(corridor)
 
+            yield ("corridor", corridor)
+
         # Update the rooms
         for part in self.dungeon_parts:
             if isinstance(part,Corridor):
                 part.afterInit(self.dungeon_tiles)
 
-        # Update the viewport
-        self.drawTiles()
-        pygame.display.update()
-
     def canPlace(self, part_to_place: DungeonPart) -> bool:
         '''
         Checks if a DungeonPart can be placed to the given @x, @y location
@@ -342,35 +354,65 @@ class Experiment2(RogueLikeDefaults):
         
         return True  
 
-    def begin(self):
-        # Create the rooms
-        self.createRooms() 
+    def drawStage(self, stage : str, data = None):
+        # Draw the connections over the rooms
+        if stage == "connections":
+            self.drawRoomConnections()
+            return
 
-        # Wait a little
-        pygame.time.delay(500)
+        # Draw the borders of the partition
+        if stage == "bsp_split":
+            import pygame
 
-        # Make connections
-        self.findRoomConnections()
+            rect = pygame.Rect(data.location.X * GRID_SIZE, data.location.Y * GRID_SIZE, data.width * GRID_SIZE, data.height * GRID_SIZE)
+            pygame.draw.rect(self.SCREEN, Color.RED, rect, 1, 0)
+            return
 
-        # Draw room connections
-        self.drawRoomConnections()
+        RogueLikeDefaults.drawStage(self, stage, data)
 
-        # Create the corridors
-        self.createCorridors()
+    def begin(self):
+        # Create the rooms, make the connections and create the corridors
+        self.pipeline.run(self)
 
-        # Wait a little
-        pygame.time.delay(500)
+        return
 
-        # Erase the lines
-        self.SCREEN.fill(Color.BLACK)
+    def iterStages(self) -> Iterator[Tuple[str, object]]:
+        '''
+        Same as begin but yields ("room", room) after every placed room, ("triangulation", triangles),
+        ("corridor", corridor) after every routed corridor and (stage, None) after every stage
+        '''
 
-        return
+        return self.pipeline.iterRun(self)
 
     def update(self):
         return
-        
+
+def createPipeline(max_results : int = MAX_MEMOIZED_RESULTS) -> Pipeline:
+    '''
+    Creates the stages of Experiment2: rooms -> connections -> corridors
+
+    :param max_results: max number of stage results to memoize, defaults to MAX_MEMOIZED_RESULTS
+    :type max_results: int, optional
+    :rtype: Pipeline
+    '''
+
+    return Pipeline([
+        Stage("rooms", Experiment2.iterRooms,
+            outputs=["dungeon_parts", "dungeon_tiles", "bsp", "possible_room_areas"],
+            params=lambda generator: {"seed": generator.seed, "width": generator.width, "height": generator.height,
+                "sparse_tiles": generator.sparse_tiles, "num_rooms": generator.num_rooms, "ROOM_WIDTH": ROOM_WIDTH, "ROOM_HEIGHT": ROOM_HEIGHT}),
+        Stage("connections", Experiment2.iterRoomConnections,
+            inputs=["dungeon_parts"],
+            outputs=["triangulation", "paths"],
+            params=lambda generator: {"seed": generator.seed, "CHANCE_OF_LOOP": CHANCE_OF_LOOP}),
+        Stage("corridors", Experiment2.iterCorridors,
+            inputs=["dungeon_parts", "dungeon_tiles", "paths"],
+            outputs=["dungeon_parts", "dungeon_tiles"]),
+    ], max_results)
+
 def main():
     ex = Experiment2(NUM_ROOMS)
+    print ("CURRENT SEED:", ex.seed)
     ex.start()
 
 if __name__ == "__main__":
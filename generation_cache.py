@@ -0,0 +1,200 @@
+'''
+Content addressed disk cache of generated dungeons.
+
+Entries are dungeon files (see dungeon_file.py) named after the hash of the generator, its GENERATOR_VERSION,
+the seed and the generation constants of the generator's module. Entries are written to a temporary file and renamed,
+so processes that share the cache never see half written entries. When the cache grows past its size
+the least recently used entries are removed
+'''
+
+# Default Modules
+import hashlib
+import importlib
+import json
+import os
+import struct
+import tempfile
+from typing import Dict, List, Tuple
+
+# Custom Modules
+from dungeon_file import DungeonFile, loadDungeon, saveDungeon
+from utilities import MinMax
+
+# Default max size of the cache in bytes
+DEFAULT_MAX_BYTES = 1024 * 2**20
+# Extension of the cache entries
+ENTRY_EXTENSION = ".dungeon"
+# Eviction removes entries until the cache is this share of its max size, so that it doesn't run on every put
+EVICTION_RATIO = 0.8
+
+
+def moduleConstants(module) -> Dict[str, object]:
+    '''
+    Collects the constants of the module that affect the generation, the ones listed in its GENERATION_CONSTANTS.
+    Modules without the list use every upper case name
+
+    :param module: generator module
+    :type module: module
+    :return: constant name -> JSON compatible value
+    :rtype: Dict[str, object]
+    '''
+
+    constants = {}
+    names = getattr(module, "GENERATION_CONSTANTS", None)
+    if names == None:
+        names = [name for name in dir(module) if name.isupper()]
+
+    for name in sorted(names):
+        value = getattr(module, name)
+        if isinstance(value, MinMax):
+            value = [value.MIN, value.MAX]
+
+        if value == None or isinstance(value, (bool, int, float, str, list, tuple)):
+            constants[name] = value
+
+    return constants
+
+def cacheKey(generator_name : str, seed : str) -> str:
+    '''
+    Hashes the generator, its version, the seed and the current constants of the generator's module
+
+    :param generator_name: module of the generator
+    :type generator_name: str
+    :param seed: random generation seed
+    :type seed: str
+    :return: hex digest
+    :rtype: str
+    '''
+
+    module = importlib.import_module(generator_name)
+
+    content = json.dumps({
+        "generator": generator_name,
+        "version": getattr(module, "GENERATOR_VERSION", 0),
+        "seed": seed,
+        "constants": moduleConstants(module),
+    }, sort_keys=True)
+
+    return hashlib.sha256(content.encode("utf-8")).hexdigest()
+
+class GenerationCache():
+    ''' Disk cache of generated dungeons, safe to share between processes '''
+
+    def __init__(self, directory : str, max_bytes : int = DEFAULT_MAX_BYTES):
+        '''
+        :param directory: directory of the cache entries, created if it doesn't exist
+        :type directory: str
+        :param max_bytes: size of the cache in bytes, defaults to DEFAULT_MAX_BYTES
+        :type max_bytes: int, optional
+        '''
+
+        self.directory = directory
+        self.max_bytes = max_bytes
+
+        os.makedirs(directory, exist_ok=True)
+
+    def entryPath(self, key : str) -> str:
+        return os.path.join(self.directory, key + ENTRY_EXTENSION)
+
+    def get(self, key : str) -> DungeonFile:
+        '''
+        :param key: key created by cacheKey
+        :type key: str
+        :return: cached dungeon, None if it's not cached or the entry is damaged
+        :rtype: DungeonFile
+        '''
+
+        path = self.entryPath(key)
+
+        try:
+            # Mark as recently used
+            os.utime(path)
+            dungeon = loadDungeon(path)
+
+            # Sections are only read when they are accessed, make sure the tiles are in the file
+            if dungeon.codes.shape != (dungeon.height, dungeon.width):
+                raise ValueError(f"{path} has damaged tiles")
+
+            return dungeon
+        except FileNotFoundError:
+            return None
+        except (ValueError, KeyError, struct.error):
+            # Truncated or damaged entry (e.g. the disk got full while it was written). Generate the dungeon again
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+
+            return None
+
+    def put(self, key : str, generator, constants : Dict[str, object] = None):
+        '''
+        Saves the dungeon of the generator. The entry is written to a temporary file and renamed to its key
+        so readers never see a half written entry. Dungeons degraded by a time limit are not saved
+
+        :param key: key created by cacheKey
+        :type key: str
+        :param generator: generator that has generated a dungeon
+        :type generator: RogueLikeDefaults
+        :param constants: constants that have been overridden, saved to the header, defaults to None
+        :type constants: Dict[str, object], optional
+        '''
+
+        # Dungeons that took shortcuts to stay within a time limit are not what the key describes
+        if len(generator.budget.degradations) > 0:
+            return
+
+        file, temp_path = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        os.close(file)
+
+        try:
+            saveDungeon(temp_path, generator, constants)
+            os.replace(temp_path, self.entryPath(key))
+        except BaseException:
+            os.remove(temp_path)
+            raise
+
+        # The size is read from the directory every time, the other processes that share the cache write to it too
+        if sum(size for _, size, _ in self.entries()) > self.max_bytes:
+            self.evict()
+
+    def entries(self) -> List[Tuple[float, int, str]]:
+        '''
+        :return: last use time, size and path of every entry
+        :rtype: List[Tuple[float, int, str]]
+        '''
+
+        entries = []
+
+        for entry in os.scandir(self.directory):
+            if not entry.name.endswith(ENTRY_EXTENSION):
+                continue
+
+            try:
+                stat = entry.stat()
+            except FileNotFoundError:
+                # Removed by another process
+                continue
+
+            entries.append((stat.st_mtime, stat.st_size, entry.path))
+
+        return entries
+
+    def evict(self):
+        '''
+        Removes the least recently used entries until the cache is within EVICTION_RATIO of @self.max_bytes,
+        so that the next puts don't have to evict right away
+        '''
+
+        entries = self.entries()
+        total = sum(size for _, size, _ in entries)
+
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes * EVICTION_RATIO:
+                break
+
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            total -= size
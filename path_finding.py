@@ -1,6 +1,6 @@
 # Default Modules
 import math
-from typing import List
+from typing import List, Set, Tuple
 
 # Custom Modules
 from dungeon_tiles import Tiles
@@ -94,25 +94,33 @@ def distancePythagorean(location : Coordinate, goal : Coordinate) -> float:
 
     return math.sqrt(math.pow(x,2) + math.pow(y,2))
     
-def isNodeTraversed(location : Coordinate, steps : List[Node]) -> bool:
+def manhattanPath(start : Coordinate, goal : Coordinate) -> List[Coordinate]:
     '''
-    Check if the location is already been traversed
+    Gets the straight path that first moves on the X axis and then on the Y axis.
+    Ignores the tiles, used to carve tunnels through the walls
+    Example:
+    S p p p
+    o o o p
+    o o o p
+    o o o G
 
-    :param location: location to search in steps
-    :type location: Coordinate
-    :param steps: steps taken
-    :type steps: List[Node]
-    :return: true if the location is already been traversed
-    :rtype: bool
-    '''    
-    
-    for node in steps:
-        if location == node.location:
-            return True
+    :param start: from location
+    :type start: Coordinate
+    :param goal: to location
+    :type goal: Coordinate
+    :return: path from start to goal including both of them
+    :rtype: List[Coordinate]
+    '''
 
-    return False
+    step_x = 1 if goal.X >= start.X else -1
+    step_y = 1 if goal.Y >= start.Y else -1
 
-def aStar(curr : Coordinate, goal : Coordinate, steps : List[Node], tiles : List[List[Tiles]]) -> List[Coordinate]:
+    path = [Coordinate(x, start.Y) for x in range(start.X, goal.X + step_x, step_x)]
+    path += [Coordinate(goal.X, y) for y in range(start.Y + step_y, goal.Y + step_y, step_y)]
+
+    return path
+
+def aStar(curr : Coordinate, goal : Coordinate, steps : List[Node], tiles : List[List[Tiles]], traversed : Set[Tuple[int, int]] = None) -> List[Coordinate]:
     '''
     Gets the shorthest path between curr and goal by using A* Pathfinding algorithm.
     https://en.wikipedia.org/wiki/A*_search_algorithm
@@ -125,8 +133,8 @@ def aStar(curr : Coordinate, goal : Coordinate, steps : List[Node], tiles : List
     :type steps: List[Node]
     :param tiles: tiles(2D matrix) to navigate in
     :type tiles: List[List[Tiles]]
-    :param rooms: Start and end room
-    :type steps: List[Room]
+    :param traversed: locations of the @steps, created from them if None, defaults to None
+    :type traversed: Set[Tuple[int, int]], optional
     :return: the shorthest path from inital curr to goal
     :rtype: List[Coordinate]
     '''    
@@ -137,6 +145,10 @@ def aStar(curr : Coordinate, goal : Coordinate, steps : List[Node], tiles : List
     # Add the starting node
     if len(steps) == 0:
         steps.append(Node(curr))
+
+    # Set of the traversed locations so that checking a location doesn't go through all of the steps
+    if traversed == None:
+        traversed = {node.location.getTuple() for node in steps}
     
     # Check if its the goal
     if curr.X == goal.X and curr.Y == goal.Y:
@@ -162,7 +174,7 @@ def aStar(curr : Coordinate, goal : Coordinate, steps : List[Node], tiles : List
             continue 
         
         # Check if the location is already been traversed
-        if isNodeTraversed(loc_to_check,steps) == True:
+        if loc_to_check.getTuple() in traversed:
             continue
 
         # distance from starting node
@@ -191,7 +203,7 @@ def aStar(curr : Coordinate, goal : Coordinate, steps : List[Node], tiles : List
     for i in range(len(steps)):
         for j in range(len(steps[i].neighbours)):
             # If the neighbour is already visited
-            if isNodeTraversed(steps[i].neighbours[j].location, steps) == True:
+            if steps[i].neighbours[j].location.getTuple() in traversed:
                 continue
             
             # If its empty give it the first element
@@ -213,8 +225,9 @@ def aStar(curr : Coordinate, goal : Coordinate, steps : List[Node], tiles : List
     if min_node != None:
         min_node.coming_from = coming_from
         steps.append(min_node)
+        traversed.add(min_node.location.getTuple())
 
-        return aStar(min_node.location, goal, steps, tiles)
+        return aStar(min_node.location, goal, steps, tiles, traversed)
          
     
     print("A* Problem!")
@@ -0,0 +1,182 @@
+'''
+Generation pipeline of stages with memoized results.
+
+Every stage declares the parameters it's run with, the attributes of the generator it reads (inputs)
+and the attributes it creates (outputs). After a stage is run, its outputs are saved under a fingerprint
+of its parameters and the fingerprints of the stages that created its inputs. When the pipeline runs again
+with the same fingerprint, the outputs are restored instead of running the stage, so changing a parameter
+of a late stage (e.g. CHANCE_OF_LOOP) only runs that stage and the stages after it
+'''
+
+# Default Modules
+import copy
+import hashlib
+import json
+from collections import OrderedDict
+from typing import Callable, Dict, Generator, List, Tuple
+
+# Max number of stage results a pipeline keeps. The least recently used results are dropped first
+MAX_MEMOIZED_RESULTS = 32
+
+# (name of the event, data of the event) yielded while the stages run
+Event = Tuple[str, object]
+
+
+class Stage():
+    ''' A step of the generation '''
+
+    def __init__(self, name : str, run : Callable, inputs : List[str] = [], outputs : List[str] = [], params : Callable = None):
+        '''
+        :param name: name of the stage, the observers are notified with it after the stage
+        :type name: str
+        :param run: called with the generator to run the stage. If it's a generator function, the events it yields are
+        passed on by Pipeline.iterRun
+        :type run: Callable[[RogueLikeDefaults], Optional[Iterator[Event]]]
+        :param inputs: attributes of the generator the stage reads, defaults to []
+        :type inputs: List[str], optional
+        :param outputs: attributes of the generator the stage creates or changes, defaults to []
+        :type outputs: List[str], optional
+        :param params: called with the generator, returns every other value the result depends on
+        (seed, constants...). Values must be JSON compatible or have a stable str, defaults to None
+        :type params: Callable[[RogueLikeDefaults], Dict[str, object]], optional
+        '''
+
+        self.name = name
+        self.run = run
+        self.inputs = inputs
+        self.outputs = outputs
+        self.params = params
+
+    def fingerprint(self, generator, input_fingerprints : Dict[str, str]) -> str:
+        '''
+        :param generator: generator to run the stage on
+        :type generator: RogueLikeDefaults
+        :param input_fingerprints: input attribute -> fingerprint of the stage that has created it
+        :type input_fingerprints: Dict[str, str]
+        :return: hash of everything the outputs of the stage depend on
+        :rtype: str
+        '''
+
+        content = json.dumps({
+            "generator": type(generator).__name__,
+            "stage": self.name,
+            "params": self.params(generator) if self.params != None else {},
+            "inputs": input_fingerprints,
+        }, sort_keys=True, default=str)
+
+        return hashlib.sha256(content.encode("utf-8")).hexdigest()
+
+class Pipeline():
+    '''
+    Runs the stages one after another and memoizes their outputs.
+    Share a pipeline between generators to reuse the results of each other
+    '''
+
+    def __init__(self, stages : List[Stage], max_results : int = MAX_MEMOIZED_RESULTS):
+        '''
+        :param stages: stages in the order they are run
+        :type stages: List[Stage]
+        :param max_results: max number of stage results to keep, defaults to MAX_MEMOIZED_RESULTS
+        :type max_results: int, optional
+        '''
+
+        self.stages = stages
+        self.max_results = max_results
+
+        # Fingerprint -> outputs of the stage
+        self.results : OrderedDict = OrderedDict()
+
+    def run(self, generator) -> List[str]:
+        '''
+        Runs the stages on the generator. Stages with memoized results are restored instead.
+        Observers of the generator are notified after every stage either way
+
+        :param generator: generator to run the stages on
+        :type generator: RogueLikeDefaults
+        :return: names of the stages that were run, the rest were restored
+        :rtype: List[str]
+        '''
+
+        events = self.iterRun(generator)
+
+        while True:
+            try:
+                next(events)
+            except StopIteration as stop:
+                return stop.value
+
+    def iterRun(self, generator) -> Generator[Event, None, List[str]]:
+        '''
+        Same as run but yields the events of the stages as they happen. Stages that are generators yield their
+        own (event, data) as they make progress (e.g. ("room", room)). After every stage (stage name, None) is yielded.
+        Restored stages only yield the latter
+
+        :param generator: generator to run the stages on
+        :type generator: RogueLikeDefaults
+        :return: names of the stages that were run, the rest were restored
+        :rtype: Generator[Event, None, List[str]]
+        '''
+
+        # Attribute -> fingerprint of the stage that has created it last
+        producers : Dict[str, str] = {}
+        ran : List[str] = []
+
+        # Once a stage takes a shortcut to stay within the time limit (see budget.py), the results depend on
+        # the timing. They are neither memoized nor restored for the rest of the run
+        degradations = len(generator.budget.degradations)
+        degraded = False
+
+        for stage in self.stages:
+            fingerprint = stage.fingerprint(generator, {name : producers.get(name) for name in stage.inputs})
+
+            if degraded or not self.restore(generator, fingerprint):
+                events = stage.run(generator)
+                if events != None:
+                    yield from events
+
+                degraded = len(generator.budget.degradations) > degradations
+                if not degraded:
+                    self.save(generator, fingerprint, stage.outputs)
+                ran.append(stage.name)
+
+            for name in stage.outputs:
+                producers[name] = fingerprint
+
+            generator.notifyStage(stage.name)
+            yield (stage.name, None)
+
+        return ran
+
+    def save(self, generator, fingerprint : str, outputs : List[str]):
+        ''' Memoizes a copy of the outputs and drops the least recently used results if there are too many '''
+
+        # Memoization is disabled, don't pay for the copy
+        if self.max_results <= 0:
+            return
+
+        # Outputs are copied together so that the references between them are kept
+        # (e.g. rooms in dungeon_parts and the rooms of the corridors)
+        self.results[fingerprint] = copy.deepcopy({name : getattr(generator, name) for name in outputs})
+
+        while len(self.results) > self.max_results:
+            self.results.popitem(last=False)
+
+    def restore(self, generator, fingerprint : str) -> bool:
+        '''
+        Sets the memoized outputs to the generator
+
+        :return: False if there is no result with the fingerprint
+        :rtype: bool
+        '''
+
+        outputs = self.results.get(fingerprint)
+        if outputs == None:
+            return False
+
+        self.results.move_to_end(fingerprint)
+
+        # Later stages change their inputs (e.g. corridors add doors to the rooms), so the memoized result is copied
+        for name, value in copy.deepcopy(outputs).items():
+            setattr(generator, name, value)
+
+        return True
@@ -0,0 +1,406 @@
+# Default Modules
+from typing import Dict, List, Tuple
+
+# Licensed Modules
+import numpy as np
+
+# Size of the buckets (in cells) used to search the closest cells of the regions
+CONNECTION_BUCKET_SIZE = 8
+# Max number of cell pairs compared at once while searching the closest cells
+PAIR_CHUNK_SIZE = 2**22
+
+
+class DisjointSet():
+    ''' Union-find structure to merge sets of integers '''
+
+    def __init__(self, size : int):
+        '''
+        :param size: number of items. Every item starts in its own set
+        :type size: int
+        '''
+
+        self.parents : List[int] = list(range(size))
+
+    def find(self, item : int) -> int:
+        '''
+        Returns the representative item of the set the item belongs to
+
+        :param item: item to find the set of
+        :type item: int
+        :return: representative item of the set
+        :rtype: int
+        '''
+
+        parents = self.parents
+        while parents[item] != item:
+            # Path halving keeps the trees flat
+            parents[item] = parents[parents[item]]
+            item = parents[item]
+
+        return item
+
+    def union(self, item1 : int, item2 : int) -> bool:
+        '''
+        Merges the sets of the given items
+
+        :return: False if the items were already in the same set
+        :rtype: bool
+        '''
+
+        root1 = self.find(item1)
+        root2 = self.find(item2)
+
+        if root1 == root2:
+            return False
+
+        # Keep the smaller item as the root so that the roots stay in scan order
+        if root2 < root1:
+            root1, root2 = root2, root1
+        self.parents[root2] = root1
+
+        return True
+
+def findRuns(cells : np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    '''
+    Finds the horizontal runs of True cells in every row
+
+    :param cells: 2D boolean grid
+    :type cells: np.ndarray
+    :return: row, start and end (exclusive) of every run in row-major order
+    :rtype: Tuple[np.ndarray, np.ndarray, np.ndarray]
+    '''
+
+    height, width = cells.shape
+
+    # Surround every row with False cells so that every run has a start and an end
+    padded = np.zeros((height, width + 2), dtype=np.int8)
+    padded[:, 1:-1] = cells
+    changes = np.diff(padded, axis=1)
+
+    rows, starts = np.nonzero(changes == 1)
+    _, ends = np.nonzero(changes == -1)
+
+    return rows, starts, ends
+
+def labelRegions(cells : np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    '''
+    Labels the 4-connected regions of True cells with a two-pass union-find over the horizontal runs of the cells.
+    Runs in O(cells) and only loops over the runs in Python.
+
+    Regions are labeled 1..n in the order of their first cell in row-major order, 0 means the cell is not part of a region
+
+    :param cells: 2D boolean grid where True means floor
+    :type cells: np.ndarray
+    :return: label of every cell, size of every region and the bounding box (top, left, bottom, right)
+    of every region where bottom and right are exclusive. Sizes and boxes are indexed by the label, index 0 is unused
+    :rtype: Tuple[np.ndarray, np.ndarray, np.ndarray]
+    '''
+
+    height, width = cells.shape
+    rows, starts, ends = findRuns(cells)
+
+    # Index of the first run of each row
+    row_begin = np.searchsorted(rows, np.arange(height + 1)).tolist()
+    start_list = starts.tolist()
+    end_list = ends.tolist()
+
+    # First pass: connect the overlapping runs of the consecutive rows
+    runs = DisjointSet(len(start_list))
+    for y in range(1, height):
+        above, above_end = row_begin[y - 1], row_begin[y]
+        below, below_end = row_begin[y], row_begin[y + 1]
+
+        while above < above_end and below < below_end:
+            if start_list[above] < end_list[below] and start_list[below] < end_list[above]:
+                runs.union(above, below)
+
+            # Move forward the run that ends first
+            if end_list[above] < end_list[below]:
+                above += 1
+            else:
+                below += 1
+
+    # Second pass: number the regions in the order they are first seen
+    region_of_root = {}
+    run_labels = np.empty(len(start_list), dtype=np.int32)
+    for run in range(len(start_list)):
+        root = runs.find(run)
+        if root not in region_of_root:
+            region_of_root[root] = len(region_of_root) + 1
+        run_labels[run] = region_of_root[root]
+
+    num_regions = len(region_of_root)
+    lengths = ends - starts
+
+    # Paint the runs onto the label grid
+    labels = np.zeros((height, width), dtype=np.int32)
+    run_offsets = np.repeat(np.cumsum(lengths) - lengths, lengths)
+    cell_indices = np.repeat(rows * width + starts, lengths) + np.arange(lengths.sum()) - run_offsets
+    labels.ravel()[cell_indices] = np.repeat(run_labels, lengths)
+
+    sizes = np.bincount(run_labels, weights=lengths, minlength=num_regions + 1).astype(np.int64)
+
+    boxes = np.zeros((num_regions + 1, 4), dtype=np.int64)
+    boxes[1:, 0:2] = [height, width]
+    np.minimum.at(boxes[:, 0], run_labels, rows)
+    np.minimum.at(boxes[:, 1], run_labels, starts)
+    np.maximum.at(boxes[:, 2], run_labels, rows + 1)
+    np.maximum.at(boxes[:, 3], run_labels, ends)
+
+    return labels, sizes, boxes
+
+class RegionIndex():
+    '''
+    Answers the region queries of a labeled grid without touching the other regions.
+    Labels are the ones created by labelRegions, 0 means the cell is not part of a region
+    '''
+
+    def __init__(self, labels : np.ndarray, sizes : np.ndarray, boxes : np.ndarray):
+        '''
+        :param labels: region of every cell
+        :type labels: np.ndarray
+        :param sizes: number of cells of every region, indexed by the label
+        :type sizes: np.ndarray
+        :param boxes: bounding box (top, left, bottom, right) of every region, indexed by the label
+        :type boxes: np.ndarray
+        '''
+
+        self.labels = labels
+        self.sizes = sizes
+        self.boxes = boxes
+
+    @staticmethod
+    def fromCells(cells : np.ndarray) -> 'RegionIndex':
+        '''
+        Labels the 4-connected regions of the True cells and indexes them
+
+        :param cells: 2D boolean grid where True means floor
+        :type cells: np.ndarray
+        :rtype: RegionIndex
+        '''
+
+        return RegionIndex(*labelRegions(cells))
+
+    @staticmethod
+    def fromConnectedCells(cells : np.ndarray) -> 'RegionIndex':
+        '''
+        Indexes all of the True cells as a single region without labeling them.
+        Only use it when the cells are known to be connected, e.g. after the tunnels of findRegionConnections are carved
+
+        :param cells: 2D boolean grid where True means floor
+        :type cells: np.ndarray
+        :rtype: RegionIndex
+        '''
+
+        rows = np.flatnonzero(cells.any(axis=1))
+        if len(rows) == 0:
+            return RegionIndex.fromCells(cells)
+
+        columns = np.flatnonzero(cells.any(axis=0))
+
+        sizes = np.array([0, np.count_nonzero(cells)], dtype=np.int64)
+        boxes = np.array([[0, 0, 0, 0], [rows[0], columns[0], rows[-1] + 1, columns[-1] + 1]], dtype=np.int64)
+
+        return RegionIndex(cells.astype(np.int32), sizes, boxes)
+
+    @property
+    def num_regions(self) -> int:
+        return len(self.sizes) - 1
+
+    def labelAt(self, x : int, y : int) -> int:
+        '''
+        :return: label of the region of the cell, 0 if the cell is not part of a region
+        :rtype: int
+        '''
+
+        return int(self.labels[y, x])
+
+    def labelsAt(self, xs : np.ndarray, ys : np.ndarray) -> np.ndarray:
+        '''
+        Vectorized version of labelAt
+
+        :param xs: X of the cells
+        :type xs: np.ndarray
+        :param ys: Y of the cells
+        :type ys: np.ndarray
+        :return: label of every cell
+        :rtype: np.ndarray
+        '''
+
+        return self.labels[ys, xs]
+
+    def tilesOf(self, label : int) -> np.ndarray:
+        '''
+        Finds the cells of the region. Only the bounding box of the region is searched
+
+        :param label: label of the region
+        :type label: int
+        :return: (N,2) array of the x, y of the cells in row-major order
+        :rtype: np.ndarray
+        '''
+
+        top, left, bottom, right = self.boxes[label]
+        ys, xs = np.nonzero(self.labels[top:bottom, left:right] == label)
+
+        return np.stack((xs + left, ys + top), axis=1)
+
+    def regionSizes(self) -> np.ndarray:
+        '''
+        :return: number of cells of the regions 1..n, index i is the size of the region i+1
+        :rtype: np.ndarray
+        '''
+
+        return self.sizes[1:]
+
+def findBoundaryCells(labels : np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    '''
+    Finds the cells of the regions that touch a wall or the edge of the map
+
+    :param labels: region of every cell, 0 = wall
+    :type labels: np.ndarray
+    :return: x, y and label of the boundary cells
+    :rtype: Tuple[np.ndarray, np.ndarray, np.ndarray]
+    '''
+
+    padded = np.pad(labels != 0, 1, constant_values=False)
+    inner = padded[:-2, 1:-1] & padded[2:, 1:-1] & padded[1:-1, :-2] & padded[1:-1, 2:]
+
+    ys, xs = np.nonzero((labels != 0) & ~inner)
+    return xs, ys, labels[ys, xs]
+
+def findClosestPairs(xs : np.ndarray, ys : np.ndarray, point_labels : np.ndarray, bucket_size : int) -> Dict[Tuple[int, int], Tuple[int, int, int]]:
+    '''
+    Finds the closest cells of the regions that have cells in the same or the neighbouring buckets.
+    Cells are only compared with the cells of the 8 buckets around them, not with every cell of the map
+
+    :param xs: X of the cells
+    :type xs: np.ndarray
+    :param ys: Y of the cells
+    :type ys: np.ndarray
+    :param point_labels: region of the cells
+    :type point_labels: np.ndarray
+    :param bucket_size: size of the buckets in cells
+    :type bucket_size: int
+    :return: (label1, label2) -> (manhattan distance, cell index of label1, cell index of label2) where label1 < label2
+    :rtype: Dict[Tuple[int, int], Tuple[int, int, int]]
+    '''
+
+    # Bucket of every cell. Columns are shifted by one so that the neighbouring buckets never wrap around the rows
+    columns = int(xs.max()) // bucket_size + 3
+    bucket_ids = (ys // bucket_size) * columns + xs // bucket_size + 1
+
+    # Sort the cells by their bucket so that the cells of a bucket are consecutive
+    order = np.argsort(bucket_ids, kind="stable")
+    sorted_ids = bucket_ids[order]
+    sorted_xs = xs[order]
+    sorted_ys = ys[order]
+    sorted_labels = point_labels[order].astype(np.int64)
+
+    num_ids = int(sorted_ids[-1]) + columns + 2
+    counts = np.bincount(sorted_ids, minlength=num_ids)
+    starts = np.cumsum(counts) - counts
+    key_base = int(point_labels.max()) + 1
+
+    found_keys, found_distances, found_cells1, found_cells2 = [], [], [], []
+
+    # Half of the neighbours is enough since the pairs are symmetrical
+    for offset_x, offset_y in ((0, 0), (1, 0), (-1, 1), (0, 1), (1, 1)):
+        partner_ids = sorted_ids + offset_y * columns + offset_x
+        partner_counts = counts[partner_ids]
+        partner_starts = starts[partner_ids]
+
+        # Split the cells so that a chunk doesn't create more than PAIR_CHUNK_SIZE pairs
+        pair_ends = np.cumsum(partner_counts)
+        chunk_ends = np.searchsorted(pair_ends, np.arange(PAIR_CHUNK_SIZE, int(pair_ends[-1]) + PAIR_CHUNK_SIZE, PAIR_CHUNK_SIZE), side="right")
+        chunk_start = 0
+
+        for chunk_end in np.unique(chunk_ends).tolist():
+            if chunk_end <= chunk_start:
+                continue
+
+            chunk_counts = partner_counts[chunk_start:chunk_end]
+            num_pairs = int(chunk_counts.sum())
+
+            # Every cell of the chunk paired with every cell of its partner bucket
+            cells1 = np.repeat(np.arange(chunk_start, chunk_end), chunk_counts)
+            pair_offsets = np.arange(num_pairs) - np.repeat(np.cumsum(chunk_counts) - chunk_counts, chunk_counts)
+            cells2 = np.repeat(partner_starts[chunk_start:chunk_end], chunk_counts) + pair_offsets
+            chunk_start = chunk_end
+
+            different = sorted_labels[cells1] != sorted_labels[cells2]
+            cells1 = cells1[different]
+            cells2 = cells2[different]
+            if len(cells1) == 0:
+                continue
+
+            # Keep the cell of the smaller label first
+            swap = sorted_labels[cells1] > sorted_labels[cells2]
+            cells1, cells2 = np.where(swap, cells2, cells1), np.where(swap, cells1, cells2)
+
+            distances = np.abs(sorted_xs[cells1] - sorted_xs[cells2]) + np.abs(sorted_ys[cells1] - sorted_ys[cells2])
+            keys = sorted_labels[cells1] * key_base + sorted_labels[cells2]
+
+            # Closest pair of every region pair within the chunk
+            by_distance = np.lexsort((distances, keys))
+            _, first_of_key = np.unique(keys[by_distance], return_index=True)
+            closest = by_distance[first_of_key]
+
+            found_keys.append(keys[closest])
+            found_distances.append(distances[closest])
+            found_cells1.append(cells1[closest])
+            found_cells2.append(cells2[closest])
+
+    if len(found_keys) == 0:
+        return {}
+
+    # Closest pair of every region pair over all of the chunks
+    keys = np.concatenate(found_keys)
+    distances = np.concatenate(found_distances)
+    by_distance = np.lexsort((distances, keys))
+    _, first_of_key = np.unique(keys[by_distance], return_index=True)
+    closest = by_distance[first_of_key]
+
+    cells1 = order[np.concatenate(found_cells1)[closest]]
+    cells2 = order[np.concatenate(found_cells2)[closest]]
+
+    pairs : Dict[Tuple[int, int], Tuple[int, int, int]] = {}
+    for key, distance, cell1, cell2 in zip(keys[closest].tolist(), distances[closest].tolist(), cells1.tolist(), cells2.tolist()):
+        pairs[(key // key_base, key % key_base)] = (distance, cell1, cell2)
+
+    return pairs
+
+def findRegionConnections(index : RegionIndex, bucket_size : int = CONNECTION_BUCKET_SIZE) -> List[Tuple[Tuple[int, int], Tuple[int, int]]]:
+    '''
+    Finds the tunnels that connect all of the regions with the minimum total length.
+    Regions are connected through the closest boundary cells found with a bucket grid (see findClosestPairs)
+    and a minimum spanning tree is built over them with Kruskal's algorithm.
+    If the close regions can't connect everything, the buckets are doubled until they do
+
+    :param index: labeled regions
+    :type index: RegionIndex
+    :param bucket_size: initial size of the buckets in cells, defaults to CONNECTION_BUCKET_SIZE
+    :type bucket_size: int, optional
+    :return: (x, y) of the cells at the ends of every tunnel
+    :rtype: List[Tuple[Tuple[int, int], Tuple[int, int]]]
+    '''
+
+    if index.num_regions < 2:
+        return []
+
+    xs, ys, point_labels = findBoundaryCells(index.labels)
+    map_size = max(index.labels.shape)
+
+    while True:
+        closest = findClosestPairs(xs, ys, point_labels, bucket_size)
+
+        regions = DisjointSet(index.num_regions + 1)
+        tunnels = []
+        for (label1, label2), (_, cell1, cell2) in sorted(closest.items(), key=lambda item: (item[1][0], item[0])):
+            if regions.union(label1, label2):
+                tunnels.append(((int(xs[cell1]), int(ys[cell1])), (int(xs[cell2]), int(ys[cell2]))))
+
+        # Every region is in a single bucket once the buckets cover the map, so this always ends
+        if len(tunnels) == index.num_regions - 1 or bucket_size >= map_size:
+            return tunnels
+
+        bucket_size *= 2
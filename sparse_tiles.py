@@ -0,0 +1,161 @@
+'''
+Sparse tile storage for maps that are mostly empty.
+
+The map is divided into square chunks and only the chunks that have a tile other than the default tile are allocated.
+SparseTileGrid can be used wherever a 2D list of tiles is used (grid[y][x], len(grid), len(grid[0]), iterating the rows),
+operations over the whole grid (items, toCodes) only go through the allocated chunks
+'''
+
+# Default Modules
+from typing import Dict, Iterator, List, Tuple
+
+# Custom Modules
+from dungeon_tiles import TILE_CODES, Tile, Tiles
+
+# Number of tiles on both axes of a chunk. Must be a power of 2
+SPARSE_CHUNK_SIZE = 32
+
+
+class SparseTileRow():
+    ''' Row of a SparseTileGrid. Reads and writes the tiles of the row through the chunks of the grid '''
+
+    __slots__ = ("grid", "chunk_y", "row_offset")
+
+    def __init__(self, grid, y : int):
+        '''
+        :param grid: grid of the row
+        :type grid: SparseTileGrid
+        :param y: index of the row
+        :type y: int
+        '''
+
+        self.grid = grid
+        self.chunk_y = y >> grid.shift
+        # Index of the first tile of the row in a chunk
+        self.row_offset = (y & grid.mask) << grid.shift
+
+    def __len__(self) -> int:
+        return self.grid.width
+
+    def __iter__(self) -> Iterator[Tile]:
+        for x in range(self.grid.width):
+            yield self[x]
+
+    def __getitem__(self, x):
+        grid = self.grid
+
+        if isinstance(x, slice):
+            return [self[i] for i in range(*x.indices(grid.width))]
+
+        if x < 0:
+            x += grid.width
+        if x < 0 or x >= grid.width:
+            raise IndexError("tile index out of range")
+
+        chunk = grid.chunks.get((x >> grid.shift, self.chunk_y))
+        if chunk == None:
+            return grid.default
+
+        return chunk[self.row_offset + (x & grid.mask)]
+
+    def __setitem__(self, x : int, tile : Tile):
+        grid = self.grid
+
+        if x < 0:
+            x += grid.width
+        if x < 0 or x >= grid.width:
+            raise IndexError("tile index out of range")
+
+        key = (x >> grid.shift, self.chunk_y)
+        chunk = grid.chunks.get(key)
+
+        if chunk == None:
+            # Unallocated chunks are already the default tile
+            if tile is grid.default:
+                return
+            chunk = grid.chunks[key] = [grid.default] * (grid.chunk_size * grid.chunk_size)
+
+        chunk[self.row_offset + (x & grid.mask)] = tile
+
+class SparseTileGrid():
+    ''' 2D matrix of tiles that only allocates the chunks with tiles other than the default tile '''
+
+    def __init__(self, width : int, height : int, default : Tile = Tiles.EMPTY_BLOCK, chunk_size : int = SPARSE_CHUNK_SIZE):
+        '''
+        :param width: number of tiles on the X axis
+        :type width: int
+        :param height: number of tiles on the Y axis
+        :type height: int
+        :param default: tile of the unallocated chunks, defaults to Tiles.EMPTY_BLOCK
+        :type default: Tile, optional
+        :param chunk_size: number of tiles on both axes of a chunk, defaults to SPARSE_CHUNK_SIZE
+        :type chunk_size: int, optional
+        :raises ValueError: if the chunk size is not a power of 2
+        '''
+
+        if chunk_size <= 0 or chunk_size & (chunk_size - 1) != 0:
+            raise ValueError(f"Chunk size must be a power of 2: {chunk_size}")
+
+        self.width = width
+        self.height = height
+        self.default = default
+
+        self.chunk_size = chunk_size
+        self.shift = chunk_size.bit_length() - 1
+        self.mask = chunk_size - 1
+
+        # (chunk x, chunk y) -> tiles of the chunk in row-major order
+        self.chunks : Dict[Tuple[int, int], List[Tile]] = {}
+
+        self.rows = [SparseTileRow(self, y) for y in range(height)]
+
+    def __len__(self) -> int:
+        return self.height
+
+    def __iter__(self) -> Iterator[SparseTileRow]:
+        return iter(self.rows)
+
+    def __getitem__(self, y) -> SparseTileRow:
+        return self.rows[y]
+
+    def items(self) -> Iterator[Tuple[int, int, Tile]]:
+        '''
+        Goes through the tiles that are not the default tile. Only the allocated chunks are checked
+
+        :return: x, y and the tile
+        :rtype: Iterator[Tuple[int, int, Tile]]
+        '''
+
+        size = self.chunk_size
+
+        for (chunk_x, chunk_y), chunk in self.chunks.items():
+            for index, tile in enumerate(chunk):
+                if tile is not self.default:
+                    yield chunk_x * size + (index & self.mask), chunk_y * size + (index >> self.shift), tile
+
+    def toCodes(self) -> bytes:
+        '''
+        Same as dungeon_tiles.tilesToCodes, the codes of the unallocated chunks are not looked up
+
+        :return: code of every tile in row-major order
+        :rtype: bytes
+        '''
+
+        size = self.chunk_size
+        codes = bytearray([TILE_CODES[self.default]]) * (self.width * self.height)
+
+        for (chunk_x, chunk_y), chunk in self.chunks.items():
+            x = chunk_x * size
+            # Chunks on the right and bottom edges can be partly outside of the grid
+            width = min(size, self.width - x)
+
+            for row in range(min(size, self.height - chunk_y * size)):
+                start = (chunk_y * size + row) * self.width + x
+                codes[start:start + width] = bytes(TILE_CODES[tile] for tile in chunk[row * size:row * size + width])
+
+        return bytes(codes)
+
+    def allocatedTiles(self) -> int:
+        ''' Number of tiles in the allocated chunks '''
+
+        return len(self.chunks) * self.chunk_size * self.chunk_size
@@ -0,0 +1,6 @@
+# Default Modules
+import os
+import sys
+
+# The modules are in the root of the repository
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
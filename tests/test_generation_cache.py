@@ -0,0 +1,39 @@
+# Default Modules
+import os
+
+# Custom Modules
+from batch_generate import createTasks, runBatch
+from experiment_two import Experiment2
+from generation_cache import ENTRY_EXTENSION, GenerationCache, cacheKey
+
+
+def cacheSize(directory : str) -> int:
+    ''' Size of the cache entries in the directory in bytes '''
+
+    return sum(entry.stat().st_size for entry in os.scandir(directory) if entry.name.endswith(ENTRY_EXTENSION))
+
+def test_batch_keeps_cache_within_size(tmp_path):
+    cache = GenerationCache(str(tmp_path / "cache"), 30 * 1024)
+    tasks = createTasks([f"CACHE{i}" for i in range(12)], {})
+
+    runBatch("experiment_two", tasks, str(tmp_path / "dungeons.jsonl"), workers=2, chunk_size=2, cache=cache)
+
+    assert 0 < cacheSize(cache.directory) <= cache.max_bytes
+
+def test_damaged_entry_is_a_miss(tmp_path):
+    cache = GenerationCache(str(tmp_path / "cache"))
+    generator = Experiment2(seed="DAMAGED")
+    generator.generate()
+
+    key = cacheKey("experiment_two", generator.seed)
+    cache.put(key, generator)
+
+    with open(cache.entryPath(key), "rb") as file:
+        data = file.read()
+
+    for damaged in (b"", data[:20], data[:len(data) // 2], b"x" * len(data)):
+        with open(cache.entryPath(key), "wb") as file:
+            file.write(damaged)
+
+        assert cache.get(key) == None
+        assert not os.path.exists(cache.entryPath(key))
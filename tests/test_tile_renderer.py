@@ -0,0 +1,29 @@
+# Licensed Modules
+import pytest
+pygame = pytest.importorskip("pygame")
+
+# Custom Modules
+from camera import Camera
+from color_constants import Color
+from dungeon_tiles import Tiles
+from tile_renderer import TileRenderer
+
+VIEW_WIDTH = 800
+VIEW_HEIGHT = 600
+
+
+@pytest.mark.parametrize("tile_size", [6.25, 3.9, 15 * 1.25])
+def test_fractional_zoom_fills_the_view(tile_size):
+    tiles = [[Tiles.WALL] * 400 for _ in range(400)]
+    camera = Camera(VIEW_WIDTH, VIEW_HEIGHT, tile_size)
+    camera.pan(123, 45)
+
+    screen = pygame.Surface((VIEW_WIDTH, VIEW_HEIGHT))
+    screen.fill(Color.BLACK)
+    TileRenderer(15).drawTiles(screen, tiles, camera)
+
+    # Walls fill their whole grid, so every pixel of the view is drawn
+    wall = screen.map_rgb(Tiles.WALL.color)
+    assert screen.get_at_mapped((VIEW_WIDTH - 1, VIEW_HEIGHT - 1)) == wall
+    assert screen.get_at_mapped((VIEW_WIDTH - 1, 0)) == wall
+    assert screen.get_at_mapped((0, VIEW_HEIGHT - 1)) == wall
@@ -0,0 +1,181 @@
+# Default Modules
+from typing import Dict, List, Tuple
+
+# Licensed Modules
+import pygame
+
+# Custom Modules
+from camera import Camera
+from dungeon_tiles import Tile, Tiles
+
+# Tiles smaller than this (in pixels) are drawn from the minimap texture instead of sprites
+MIN_SPRITE_SIZE = 2
+# Max number of texels on each axis of the minimap texture
+MINIMAP_RESOLUTION = 256
+
+
+class TileRenderer():
+    '''
+    Draws the tile map by blitting pre-rendered tile sprites.
+    Each tile type is rendered once into a small surface (based on its @size_ratio and @color)
+    and the whole frame is composed with a single Surface.blits call
+    '''
+
+    def __init__(self, grid_size : int):
+        '''
+        :param grid_size: Size of the each tile in pixels
+        :type grid_size: int
+        '''
+
+        self.grid_size = grid_size
+
+        # Pre-rendered sprites. (Tile, tile size) -> (sprite, offset to center the sprite within the grid)
+        self.sprites : Dict[Tuple[Tile, int], Tuple[pygame.Surface, int]] = {}
+
+    def getSprite(self, tile : Tile, grid_size : int = None) -> Tuple[pygame.Surface, int]:
+        '''
+        Returns the pre-rendered sprite of the tile. Renders it if it doesn't exist yet
+
+        :param tile: Tile to get the sprite of
+        :type tile: Tile
+        :param grid_size: size of the grid in pixels, defaults to @self.grid_size
+        :type grid_size: int, optional
+        :return: sprite and the offset needed to align it to the center of the grid
+        :rtype: Tuple[pygame.Surface, int]
+        '''
+
+        if grid_size == None:
+            grid_size = self.grid_size
+
+        sprite = self.sprites.get((tile, grid_size))
+        if sprite != None:
+            return sprite
+
+        # Apply size reduction based on ratio
+        tile_size = (grid_size/100) * tile.size_ratio
+
+        # Offset to align the tile to the center based on the size
+        # Casting to int truncates the same way pygame.Rect does
+        offset = int((grid_size - tile_size) / 2)
+
+        surface = pygame.Surface((int(tile_size), int(tile_size)))
+        surface.fill(tile.color)
+
+        self.sprites[(tile, grid_size)] = (surface, offset)
+        return self.sprites[(tile, grid_size)]
+
+    def drawTiles(self, screen : pygame.Surface, tiles : List[List[Tiles]], camera : Camera = None):
+        '''
+        Draws the tiles to the screen in one batch.
+        If a camera is given only the tiles within the view are drawn
+
+        :param screen: Surface to draw to
+        :type screen: pygame.Surface
+        :param tiles: 2D matrix of tiles to draw
+        :type tiles: List[List[Tiles]]
+        :param camera: camera to draw the tiles from, defaults to None
+        :type camera: Camera, optional
+        '''
+
+        if camera == None:
+            self.drawTileRange(screen, tiles, (0, 0, len(tiles[0]), len(tiles)), self.grid_size, (0, 0))
+            return
+
+        # Too small to see the sprites, fall back to the minimap
+        if camera.tile_size < MIN_SPRITE_SIZE:
+            self.drawMinimap(screen, tiles, camera.visibleTiles(len(tiles[0]), len(tiles)), camera)
+            return
+
+        # Sprites are drawn with a whole number of pixels. The visible range and the origin are found with the same size
+        # so that the tiles cover the whole view at the zoom levels in between
+        grid_size = int(camera.tile_size)
+        visible = camera.visibleTiles(len(tiles[0]), len(tiles), grid_size)
+        origin = (int(-camera.X * grid_size), int(-camera.Y * grid_size))
+        self.drawTileRange(screen, tiles, visible, grid_size, origin)
+
+        return
+
+    def drawTileRange(self, screen : pygame.Surface, tiles : List[List[Tiles]], tile_range : Tuple[int, int, int, int], grid_size : int, origin : Tuple[int, int]):
+        '''
+        Draws the tiles within the @tile_range with sprites
+
+        :param screen: Surface to draw to
+        :type screen: pygame.Surface
+        :param tiles: 2D matrix of tiles to draw
+        :type tiles: List[List[Tiles]]
+        :param tile_range: x0, y0, x1, y1 of the tiles to draw. x1 and y1 are exclusive
+        :type tile_range: Tuple[int, int, int, int]
+        :param grid_size: size of the each tile in pixels
+        :type grid_size: int
+        :param origin: screen location of the tile (0,0) in pixels
+        :type origin: Tuple[int, int]
+        '''
+
+        x0, y0, x1, y1 = tile_range
+        blit_sequence = []
+
+        for y in range(y0, y1):
+            pixel_y = y * grid_size + origin[1]
+            row = tiles[y]
+
+            for x in range(x0, x1):
+                sprite, offset = self.getSprite(row[x], grid_size)
+                blit_sequence.append((sprite, (x * grid_size + origin[0] + offset, pixel_y + offset)))
+
+        # Single C level call instead of a draw call per tile
+        screen.blits(blit_sequence, False)
+
+        return
+
+    def drawMinimap(self, screen : pygame.Surface, tiles : List[List[Tiles]], tile_range : Tuple[int, int, int, int], camera : Camera):
+        '''
+        Draws the tiles within the @tile_range as a down-sampled texture where one texel is
+        a block of tiles. The texture size is bounded by MINIMAP_RESOLUTION, not by the map size
+
+        :param screen: Surface to draw to
+        :type screen: pygame.Surface
+        :param tiles: 2D matrix of tiles to draw
+        :type tiles: List[List[Tiles]]
+        :param tile_range: x0, y0, x1, y1 of the tiles to draw. x1 and y1 are exclusive
+        :type tile_range: Tuple[int, int, int, int]
+        :param camera: camera to draw the tiles from
+        :type camera: Camera
+        '''
+
+        x0, y0, x1, y1 = tile_range
+        if x1 <= x0 or y1 <= y0:
+            return
+
+        # Texture size
+        texture_width = min(x1 - x0, MINIMAP_RESOLUTION)
+        texture_height = min(y1 - y0, MINIMAP_RESOLUTION)
+
+        # Tile that represents each of the texels
+        sample_x = [x0 + (i * (x1 - x0)) // texture_width for i in range(texture_width)]
+        sample_y = [y0 + (i * (y1 - y0)) // texture_height for i in range(texture_height)]
+
+        texture = pygame.Surface((texture_width, texture_height))
+        colors : Dict[Tile, int] = {}
+        pixels = pygame.PixelArray(texture)
+
+        for j in range(texture_height):
+            row = tiles[sample_y[j]]
+            column = []
+
+            for x in sample_x:
+                tile = row[x]
+                color = colors.get(tile)
+                if color == None:
+                    color = colors[tile] = texture.map_rgb(tile.color)
+                column.append(color)
+
+            pixels[:, j] = column
+
+        pixels.close()
+
+        # Stretch the texture to cover the visible tiles
+        size = (int((x1 - x0) * camera.tile_size) + 1, int((y1 - y0) * camera.tile_size) + 1)
+        location = (int((x0 - camera.X) * camera.tile_size), int((y0 - camera.Y) * camera.tile_size))
+        screen.blit(pygame.transform.scale(texture, size), location)
+
+        return
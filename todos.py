@@ -3,4 +3,5 @@ todos = '''TODOS:
 - A* don't include the part within the room 
 '''
 
-print(todos)
\ No newline at end of file
+if __name__ == "__main__":
+    print(todos)
\ No newline at end of file
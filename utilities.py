@@ -1,7 +1,9 @@
 # Default Modules
+from contextlib import contextmanager
 from enum import Enum
-from typing import List, Tuple
+from typing import Dict, List, Tuple
 import random
+import string
 
 # Custom Modules
 from dungeon_tiles import Tiles
@@ -98,6 +100,33 @@ def percentageDifference(number1, number2):
 
     return ((number2 - number1) / (number1)) * 100
 
+def splitOffset(size : int, shift_percentage : int = 0, rng : random.Random = None) -> int:
+    '''
+    Picks the location of the line that splits a length into two parts.
+    The line is placed at the middle and moved randomly by at most @shift_percentage of the half length
+
+    :param size: length to split
+    :type size: int
+    :param shift_percentage: max amount that the mid-line can move towards either sides, defaults to 0
+    :type shift_percentage: int, optional
+    :param rng: random generator to draw from, defaults to the global random module
+    :type rng: random.Random, optional
+    :return: length of the first part
+    :rtype: int
+    '''
+
+    if rng == None:
+        rng = random
+
+    # Mid line
+    mid_line = int(size / 2)
+
+    # Shift amount
+    max_shift_amount = int(getPercentage(mid_line, shift_percentage))
+
+    # The result will be the mid point where we will split the areas
+    return mid_line + rng.randint(-max_shift_amount, max_shift_amount)
+
 class SquareArea():
     ''' Basic tree node '''
     def __init__(self, location : Coordinate, width : int, height : int) -> None:
@@ -106,23 +135,19 @@ class SquareArea():
         self.height = height
         self.child_squares : List[SquareArea] = []
 
-    def splitHorizontally(self, shift_percentage : int = 0):
+    def splitHorizontally(self, shift_percentage : int = 0, rng : random.Random = None):
         ''' Split the owning squarearea horizontally
         
         :param shift_percentage: max amount that the mid-line can move towards one of the sides, defaults to 10
         :type shift_percentage: int, optional
+        :param rng: random generator to draw from, defaults to the global random module
+        :type rng: random.Random, optional
         :return: Resulting parts
         :rtype: [SquareArea, SquareArea]
         '''    
 
-        # Mid line
-        mid_line = int(self.width / 2)
-
-        # Shift amount
-        max_shift_amount = int(getPercentage(mid_line, shift_percentage))
-
         # The result will be the mid point where we will split the areas
-        split_loc_x = mid_line + random.randint(-max_shift_amount, max_shift_amount)
+        split_loc_x = splitOffset(self.width, shift_percentage, rng)
 
         # Part before the splitting line
         area1 : SquareArea = SquareArea(self.location, split_loc_x, self.height)
@@ -133,23 +158,19 @@ class SquareArea():
 
         return [area1, area2]
 
-    def splitVertically(self, shift_percentage : int = 0):
+    def splitVertically(self, shift_percentage : int = 0, rng : random.Random = None):
         ''' Split the owning squarearea vertically
 
         :param shift_percentage: max amount that the mid-line can move towards either sides, defaults to 0
         :type shift_percentage: int, optional
+        :param rng: random generator to draw from, defaults to the global random module
+        :type rng: random.Random, optional
         :return: Resulting parts
         :rtype: [SquareArea, SquareArea]
         '''        
 
-        # Mid line
-        mid_line = int(self.height / 2)
-
-        # Shift amount
-        max_shift_amount = int(getPercentage(mid_line, shift_percentage))
-
         # The result will be the mid point where we will split the areas
-        split_loc_y = mid_line + random.randint(-max_shift_amount, max_shift_amount)
+        split_loc_y = splitOffset(self.height, shift_percentage, rng)
 
         # Part before the splitting line
         area1 : SquareArea = SquareArea(self.location, self.width, split_loc_y)
@@ -161,6 +182,18 @@ class SquareArea():
         return [area1, area2]
 
 
+def generateSeed(length : int = 8) -> str:
+    '''
+    Generates a random seed from uppercase letters and digits
+
+    :param length: number of characters in the seed, defaults to 8
+    :type length: int, optional
+    :return: random seed
+    :rtype: str
+    '''
+
+    return ''.join(random.SystemRandom().choice(string.ascii_uppercase + string.digits) for _ in range(length))
+
 class MinMax():
     ''' Simple class that holds two variables under the name of MIN and MAX.'''
 
@@ -288,4 +321,33 @@ def globalToRelative(point_of_origin: Coordinate, global_point: Coordinate) -> C
         # print("WARNING: Relative point is behind the origin point")
         return Coordinate(-1, -1)
 
-    return relative_coord
\ No newline at end of file
+    return relative_coord
+
+@contextmanager
+def overrideConstants(module, constants : Dict[str, object]):
+    '''
+    Replaces the constants of the module within the with block and restores the defaults afterwards.
+    Tuple values of MinMax constants are converted to MinMax
+
+    :param module: module that has the constants
+    :type module: module
+    :param constants: constant name -> value to use
+    :type constants: Dict[str, object]
+    :raises AttributeError: if the module doesn't have one of the constants
+    '''
+
+    defaults = {}
+    for name in constants:
+        if not hasattr(module, name):
+            raise AttributeError(f"{module.__name__} doesn't have the constant {name}")
+        defaults[name] = getattr(module, name)
+
+    try:
+        for name, value in constants.items():
+            if isinstance(defaults[name], MinMax) and isinstance(value, (tuple, list)):
+                value = MinMax(*value)
+            setattr(module, name, value)
+        yield
+    finally:
+        for name, value in defaults.items():
+            setattr(module, name, value)